@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+SERVICE_URL = os.environ.get("SERVICE_URL", "http://service:80")
+# (connect, read) timeouts in seconds
+TIMEOUT = (float(os.environ.get("API_CONNECT_TIMEOUT", 3)), float(os.environ.get("API_READ_TIMEOUT", 30)))
+# Keep-alive connections held to the service, and requests run at once by fetch_all()
+POOL_SIZE = int(os.environ.get("API_POOL_SIZE", 10))
+
+# Retry failed connections and gateway errors with backoff. Only idempotent methods are retried,
+# so a POST that may have reached the service is never sent twice.
+RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD", "PUT", "DELETE"}),
+    raise_on_status=False,
+)
+
+
+def _make_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=RETRY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"accept": "application/json"})
+    return session
+
+
+# Shared by every page and script run, so connections to the service are reused across reruns.
+# The urllib3 pool behind it is thread-safe.
+session = _make_session()
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="api")
+
+
+def request(method: str, path: str, **kwargs) -> requests.Response:
+    """
+    Send a request to the service over a pooled keep-alive connection.
+
+    Args:
+        method (str): HTTP method.
+        path (str): Path on the service, e.g. "/companies/".
+        **kwargs: Arguments of requests.Session.request, e.g. params or json.
+
+    Returns:
+        requests.Response: The response, whatever its status code.
+    """
+    kwargs.setdefault("timeout", TIMEOUT)
+    return session.request(method, f"{SERVICE_URL}{path}", **kwargs)
+
+
+def get(path: str, **kwargs) -> requests.Response:
+    return request("GET", path, **kwargs)
+
+
+def post(path: str, **kwargs) -> requests.Response:
+    return request("POST", path, **kwargs)
+
+
+def put(path: str, **kwargs) -> requests.Response:
+    return request("PUT", path, **kwargs)
+
+
+def delete(path: str, **kwargs) -> requests.Response:
+    return request("DELETE", path, **kwargs)
+
+
+def get_json(path: str, params: dict = None):
+    """
+    Get a resource from the service and decode its JSON body.
+
+    Raises:
+        requests.HTTPError: If the service answered with an error status.
+    """
+    response = get(path, params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_all(*calls) -> list:
+    """
+    Get several independent resources at once, so the wait is that of the slowest one.
+
+    Args:
+        *calls: Paths, or (path, params) tuples.
+
+    Returns:
+        list: The decoded JSON bodies, in the order of the calls.
+
+    Raises:
+        requests.HTTPError: If any call failed.
+    """
+    calls = [(call, None) if isinstance(call, str) else call for call in calls]
+    futures = [_executor.submit(get_json, path, params) for path, params in calls]
+    return [future.result() for future in futures]
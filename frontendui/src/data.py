@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import streamlit as st
+
+import api
+
+# Seconds a cached lookup is served before it is fetched again. Writes from this app clear the
+# matching caches at once; the TTL bounds how stale writes made elsewhere can look.
+CACHE_TTL = int(os.environ.get("FRONTEND_CACHE_TTL", 30))
+
+# Tables whose rows go with a deleted parent, by batch endpoint table name
+CHILD_TABLES = {
+    "companies": ["branches", "carbon_offsets"],
+    "branches": ["emissionssources"],
+    "emissionssources": ["footprints", "sequestrations"],
+}
+
+
+def _frame(rows: list) -> pd.DataFrame:
+    """
+    Build the DataFrame the editors show: sorted by id, with id as the first column.
+    """
+    frame = pd.DataFrame(rows)
+    if frame.empty:
+        return frame
+    frame.sort_values(by=['id'], inplace=True, ignore_index=True)
+    return frame[['id'] + [col for col in frame.columns.values if col != 'id']]
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def companies() -> pd.DataFrame:
+    return _frame(api.get_json("/companies/"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def branches(company_id: int) -> pd.DataFrame:
+    return _frame(api.get_json(f"/companies/{company_id}/branches"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def carbon_offsets(company_id: int) -> pd.DataFrame:
+    return _frame(api.get_json(f"/companies/{company_id}/carbon_offsets"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def emissionssources(branch_id: int) -> pd.DataFrame:
+    return _frame(api.get_json(f"/branch/{branch_id}/emissionssources/"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def regulations() -> pd.DataFrame:
+    return _frame(api.get_json("/regulations/"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def footprints(source_id: int) -> pd.DataFrame:
+    return _frame(api.get_json(f"/emissionssource/{source_id}/footprints/"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def sequestrations(source_id: int) -> pd.DataFrame:
+    return _frame(api.get_json(f"/emissionssource/{source_id}/sequestrations/"))
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def overview() -> tuple:
+    """
+    Get the summary of all companies and the company list, fetched at once.
+    """
+    summary, company_rows = api.fetch_all("/companies/summary", "/companies/")
+    return summary, _frame(company_rows)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def company_tree(company_id: int) -> dict:
+    return api.get_json(f"/company/{company_id}/tree", params={"aggregates": "true"})
+
+
+TABLE_CACHES = {
+    "companies": companies,
+    "branches": branches,
+    "carbon_offsets": carbon_offsets,
+    "emissionssources": emissionssources,
+    "regulations": regulations,
+    "footprints": footprints,
+    "sequestrations": sequestrations,
+}
+
+
+def invalidate(table: str):
+    """
+    Clear the cached lookups a write to a table may have changed.
+
+    Clears the table, the tables below it (their rows go when a parent is deleted), and the
+    summaries and trees, whose totals and counts any write can move.
+
+    Args:
+        table (str): Batch endpoint table name, e.g. "branches".
+    """
+    TABLE_CACHES[table].clear()
+    for child in CHILD_TABLES.get(table, []):
+        invalidate(child)
+    overview.clear()
+    company_tree.clear()
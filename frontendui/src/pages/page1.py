@@ -1,6 +1,6 @@
 from navigation import make_sidebar
 import streamlit as st
-import requests
+import data
 from utils import const_variable as cv
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -27,7 +27,7 @@ def make_pie_plot(data: dict[str, float], title):
     return fig, ax   
     
 
-all_company_summary = requests.get("http://service:80/companies/summary").json()
+all_company_summary, company = data.overview()
 
 
 col01, col02 = st.columns(2)
@@ -45,8 +45,6 @@ st.write("## Total Information of a Company")
 col1, col2 = st.columns(2)
 
 with col1:
-    company = requests.get("http://service:80/companies/").json()
-    company = pd.DataFrame(company)
     company_name = sorted(company["c_name"].tolist())
 
     sel_comp_name = st.selectbox(
@@ -54,9 +52,15 @@ with col1:
         company_name)
     sel_comp_id = company[company["c_name"] == sel_comp_name]["id"].values[0]
 
+# The company's branches, offsets, sources and totals in one request
+company_tree = data.company_tree(int(sel_comp_id))
+branch_nodes = {branch["id"]: branch for branch in company_tree["branches"]}
+
 with col2:
-    company_branches = requests.get(f"http://service:80/companies/{sel_comp_id}/branches").json() 
-    company_branches = pd.DataFrame(company_branches)
+    company_branches = pd.DataFrame(
+        [{"branch_name": branch["branch_name"], "id": branch["id"], "company_id": sel_comp_id} for branch in company_tree["branches"]],
+        columns=["branch_name", "id", "company_id"],
+    )
     company_branches_name = sorted(company_branches["branch_name"].tolist())
 
     sel_branch_name = st.selectbox(
@@ -65,20 +69,16 @@ with col2:
     sel_branch_id = company_branches[company_branches["branch_name"] == sel_branch_name]["id"].values[0]
 
 
-carbon_offsets = requests.get(f"http://service:80/companies/{sel_comp_id}/carbon_offsets/").json()
-carbon_offsets = pd.DataFrame(carbon_offsets)
-
-number_of_branches = len(company_branches)
-
+carbon_offsets = pd.DataFrame([{**offset, "company_id": sel_comp_id} for offset in company_tree["carbon_offsets"]])
 
-company_summary = requests.get(f"http://service:80/company/{sel_comp_id}/summary/").json()
+company_summary = company_tree["summary"]
 
 company_info = {"Company Name": sel_comp_name, 
                 "Company ID": sel_comp_id, 
-                "Total number of branches": number_of_branches,
+                "Total number of branches": company_summary["number_of_branches"],
                 "Total Carbon Footprints": company_summary["total_emissions"],
                 "Total Sequestrations": company_summary["total_sequestrations"],
-                "Total Carbon Offsets": carbon_offsets["offset_amount"].sum(),
+                "Total Carbon Offsets": company_summary["total_offsets"],
                 }
 company_info = pd.DataFrame([company_info])
 st.write(f"- ### Company Info")
@@ -97,12 +97,12 @@ st.markdown('____')
 st.write("## Total Information of a Branch")
 
 
-branch_summary = requests.get(f"http://service:80/baranch/{sel_branch_id}/summary/").json()
+branch_summary = branch_nodes[sel_branch_id]["summary"]
 
 
 branch_info = {"Branch Name": sel_branch_name, 
                 "Branch ID": sel_branch_id, 
-                # "Total number of branches": number_of_branches,
+                "Total number of sources": branch_summary["number_of_sources"],
                 "Total Carbon Footprints": branch_summary["total_emissions"],
                 "Total Sequestrations": branch_summary["total_sequestrations"],
                 # "Total Carbon Offsets": carbon_offsets["offset_amount"].sum(),
@@ -113,8 +113,8 @@ st.write(f"- ### Branch Info")
 st.markdown(branch_info.style.hide(axis="index").to_html(), unsafe_allow_html=True)
 st.write("- ### Emission Sources")
 
-emissionssources = requests.get(f"http://service:80/branch/{sel_branch_id}/emissionssources/").json()
-emissionssources = pd.DataFrame(emissionssources)
+emissionssources = pd.DataFrame([{**source, "branch_id": sel_branch_id} for source in branch_nodes[sel_branch_id]["emission_sources"]])
+emissionssources = emissionssources.drop(columns=["summary"], errors="ignore")
 st.markdown(emissionssources.style.hide(axis="index").to_html(), unsafe_allow_html=True)
 
 
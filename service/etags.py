@@ -0,0 +1,54 @@
+from fastapi import Request, Response
+
+
+def make_etag(scope: str, version: int) -> str:
+    """
+    Build the ETag of a resource from the change version of the scope it is read from.
+
+    Args:
+        scope (str): Scope from models.versions.scope().
+        version (int): Current version of the scope.
+
+    Returns:
+        str: Quoted entity tag.
+    """
+    return f'"{scope}.{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check whether the client already holds the current representation.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): Current ETag of the requested resource.
+
+    Returns:
+        bool: Whether the If-None-Match header lists the ETag.
+    """
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip() for tag in header.split(",")}
+    candidates |= {tag[2:] for tag in candidates if tag.startswith("W/")}
+    return etag in candidates
+
+
+def set_etag(response: Response, etag: str):
+    """
+    Attach an ETag to a response, asking clients to revalidate it before reuse.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+
+def not_modified(etag: str) -> Response:
+    """
+    Build the 304 response telling the client its copy is still current.
+    """
+    response = Response(status_code=304)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,38 @@
+import multiprocessing
+import os
+import shutil
+
+# Production launch: gunicorn -c gunicorn.conf.py main:app
+bind = os.getenv("BIND", "0.0.0.0:80")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app once in the master, so forked workers start without importing it again.
+# Importing main opens no database connections, so workers never share one.
+preload_app = True
+
+# Seconds a worker gets to finish its requests on restart before it is killed
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+accesslog = "-"
+
+
+def on_starting(server):
+    import health
+
+    # Metrics files of a previous run would be added to this run's counters
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        shutil.rmtree(multiproc_dir, ignore_errors=True)
+        os.makedirs(multiproc_dir)
+    # Refuse to serve against a schema the code was not written for
+    health.check_schema()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,63 @@
+import os
+
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from models.database import DATABASE_URL
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+def _head_revisions() -> set:
+    config = Config(os.path.join(MODELS_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(MODELS_DIR, "migrations"))
+    return set(ScriptDirectory.from_config(config).get_heads())
+
+
+# Read once; the migration scripts only change with a new deployment
+HEAD_REVISIONS = _head_revisions()
+
+
+def _schema_status(connection) -> dict:
+    current = set(MigrationContext.configure(connection).get_current_heads())
+    return {"current": current == HEAD_REVISIONS, "revisions": sorted(current), "heads": sorted(HEAD_REVISIONS)}
+
+
+def schema_status(db: Session) -> dict:
+    """
+    Compare the database's Alembic revision with the head of the migration scripts.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        dict: Whether the schema is current, with the database's and the scripts' revisions.
+    """
+    return _schema_status(db.connection())
+
+
+def check_schema():
+    """
+    Fail unless the database at DATABASE_URL has every migration applied.
+
+    Meant to run once before workers start; uses a connection of its own so no pooled
+    connection is left behind for forked workers to share.
+
+    Raises:
+        RuntimeError: If the schema is behind or ahead of the migration scripts.
+    """
+    check_engine = create_engine(DATABASE_URL, poolclass=NullPool)
+    try:
+        with check_engine.connect() as connection:
+            status = _schema_status(connection)
+    finally:
+        check_engine.dispose()
+    if not status["current"]:
+        raise RuntimeError(
+            f"Database is at revision {status['revisions'] or 'none'}, expected {status['heads']}; "
+            "run `alembic -c models/alembic.ini upgrade head`, stamping databases created by metadata.create_all first"
+        )
@@ -1,32 +1,188 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from models import crud
+from sqlalchemy import exc
 from sqlalchemy.orm import Session
 
 # from app.models.user import User, UserCreate, UserUpdate
 # from app.dependencies.database import get_database, Database
-from models import models, schemas
-from models.database import SessionLocal, engine
-from typing import List
+from models import batch, export, models, schemas, versions
+from models.cache import InvalidationListener, summary_cache
+from models.database import (
+    DB_MODE, AsyncReplicaSessionLocals, AsyncSessionLocal, ReplicaSessionLocals, SessionLocal, async_engine,
+    async_replica_engines, engine, pool_status, replica_engines,
+)
+from etags import etag_matches, make_etag, not_modified, set_etag
+import health
+import metrics
+import ops
+import profiling
+import replicas
+import slow_queries
+from pagination import decode_cursor, set_next_cursor
+from typing import List, Optional
 
-models.Base.metadata.create_all(bind=engine)
+# Dependency
+if DB_MODE == "async":
+    async def get_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    async def get_read_db(request: Request):
+        async with replicas.read_sessionmaker(request, AsyncSessionLocal, AsyncReplicaSessionLocals)() as db:
+            yield db
+
+    async def run_crud(db, crud_function, *args, **kwargs):
+        """
+        Run a crud function on the request's AsyncSession without blocking the event loop.
+        """
+        return await db.run_sync(crud_function, *args, **kwargs)
+else:
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get_read_db(request: Request):
+        db = replicas.read_sessionmaker(request, SessionLocal, ReplicaSessionLocals)()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def run_crud(db, crud_function, *args, **kwargs):
+        """
+        Run a crud function on the request's Session in the threadpool.
+        """
+        return await run_in_threadpool(profiling.traced(crud_function), db, *args, **kwargs)
+
+
+async def resource_etag(db, table: str, parent_id: Optional[int] = None) -> str:
+    """
+    Get the current ETag of a table's rows, or of a parent's rows in a table.
 
-app = FastAPI()
+    Args:
+        db: The request's database session.
+        table (str): Name of the table the resource is read from.
+        parent_id (int): ID of the parent the rows belong to, for child tables.
 
-# Dependency
-def get_db():
-    db = SessionLocal()
+    Returns:
+        str: ETag derived from the scope's change version, read before the resource itself.
+    """
+    scope = versions.scope(table, parent_id)
+    return make_etag(scope, await run_crud(db, versions.current_version, scope))
+
+
+def plain_json_response(response: Response, rows: list, schema) -> Response:
+    """
+    Encode list rows selected with crud.plain_columns straight to JSON.
+
+    This skips building ORM objects and validating every row through the response schema, while
+    producing the same body the schema would.
+
+    Args:
+        response (Response): Response of the list route, whose headers are carried over.
+        rows (list): Rows of plain column values, in schema field order.
+        schema: Response schema of one row, e.g. schemas.Company.
+
+    Returns:
+        Response: The encoded list.
+    """
+    return Response(crud.plain_json(rows, schema), media_type="application/json", headers=dict(response.headers))
+
+
+async def run_cached(key: tuple, db, crud_function, **kwargs):
+    """
+    Serve a crud result from the summary cache, computing and caching it on a miss.
+
+    Args:
+        key (tuple): Cache key, unique per route and parameters.
+        db: The request's database session.
+        crud_function: Crud function computing the result.
+        **kwargs: Arguments of the crud function.
+
+    Returns:
+        The cached or freshly computed result.
+    """
+    if not summary_cache.enabled:
+        return await run_crud(db, crud_function, **kwargs)
+    generation = summary_cache.generation
+    found, value = summary_cache.get(key)
+    if found:
+        return value
+    value = await run_crud(db, crud_function, **kwargs)
+    summary_cache.set(key, value, generation)
+    return value
+
+
+async def read_bulk_rows(request: Request) -> list:
+    """
+    Parse the body of a bulk request into rows.
+
+    Accepts a JSON array, or NDJSON (one JSON object per line) when sent with an
+    `application/x-ndjson` content type.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        list: The parsed rows.
+    Raises:
+        HTTPException: If the body is not valid JSON or NDJSON.
+    """
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith("application/x-ndjson"):
+        rows = []
+        for line_number, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid JSON on line {line_number}")
+        return rows
     try:
-        yield db
-    finally:
-        db.close()
+        rows = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON body")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of rows")
+    return rows
+
 
+summary_cache_listener = InvalidationListener(summary_cache, engine.url)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker process, after gunicorn forks
+    summary_cache_listener.start()
+    yield
+    await run_in_threadpool(summary_cache_listener.stop)
+
+
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 
+app.middleware("http")(metrics.track_request)
+if profiling.PROFILING_ENABLED:
+    app.middleware("http")(profiling.profile_request)
+if replica_engines and replicas.READ_YOUR_WRITES_SECONDS > 0:
+    app.middleware("http")(replicas.track_writes)
+for serving_engine in [async_engine, *async_replica_engines] if DB_MODE == "async" else [engine, *replica_engines]:
+    metrics.instrument_engine(serving_engine)
+    slow_queries.instrument_engine(serving_engine)
+
 
 @router.post("/companies/", response_model=schemas.Company)
-def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)):
+async def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)):
     """
     Create a new company.
 
@@ -39,15 +195,15 @@ def create_company(company: schemas.CompanyCreate, db: Session = Depends(get_db)
     Raises:
         HTTPException: If the company with the given name is already present in the database.
     """
-    db_company = crud.get_company_by_name(db, c_name=company.c_name)
+    db_company = await run_crud(db, crud.get_company_by_name, c_name=company.c_name)
     if db_company:
         raise HTTPException(status_code=400, detail="company already added")
-    return crud.create_company(db=db, company=company)
+    return await run_crud(db, crud.create_company, company=company)
 
 
 # Get company from id endpoint
 @router.get("/company/{company_id}", response_model=schemas.Company)
-def get_company(company_id: int, db: Session = Depends(get_db)):
+async def get_company(company_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """
     Get a company from its ID.
 
@@ -56,35 +212,48 @@ def get_company(company_id: int, db: Session = Depends(get_db)):
         db (Session): SQLAlchemy database session.
 
     Returns:
-        Company: The company with the specified ID.
+        Company: The company with the specified ID, or 304 if If-None-Match holds its current ETag.
     Raises:
         HTTPException: If the company with the given name is not present in the database.
     """
-    db_company = crud.get_company_by_cid(db, company_id=company_id)
+    etag = await resource_etag(db, "companies")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    db_company = await run_crud(db, crud.get_company_by_cid, company_id=company_id)
     if db_company is None:
         raise HTTPException(status_code=400, detail="Company not found")
     return db_company
 
 # Get all companies endpoint
 @router.get("/companies/", response_model=List[schemas.Company])
-def get_companies(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_companies(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
     """
     Get all companies from the database.
 
     Args:
         skip (int): Number of records to skip (for pagination).
         limit (int): Maximum number of records to return.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
         db (Session): SQLAlchemy database session.
 
     Returns:
-        List[schemas.Company]: A list of company objects.
+        List[schemas.Company]: A list of company objects, or 304 if If-None-Match holds the current ETag.
     """
-    companies = crud.get_companies(db=db, skip=skip, limit=limit)
-    return companies
+    etag = await resource_etag(db, "companies")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    companies = await run_crud(
+        db, crud.get_companies, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        columns=crud.plain_columns(models.Company, schemas.Company),
+    )
+    set_next_cursor(response, companies, limit)
+    return plain_json_response(response, companies, schemas.Company)
 
 
 @app.put("/company/{company_id}", response_model=schemas.Company)
-def update_company(company_id: int, company_update: schemas.CompanyUpdate, db: Session = Depends(get_db)):
+async def update_company(company_id: int, company_update: schemas.CompanyUpdate, db: Session = Depends(get_db)):
     """
     Update an existing company.
 
@@ -96,13 +265,13 @@ def update_company(company_id: int, company_update: schemas.CompanyUpdate, db: S
     Returns:
         schemas.Company: The updated company.
     """
-    updated_company = crud.update_company(db=db, company_id=company_id, company_update=company_update)
+    updated_company = await run_crud(db, crud.update_company, company_id=company_id, company_update=company_update)
     if updated_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     return updated_company
 
 @app.delete("/company/{company_id}", response_model=schemas.Company)
-def delete_company(company_id: int, db: Session = Depends(get_db)):
+async def delete_company(company_id: int, db: Session = Depends(get_db)):
     """
     Delete an existing company.
 
@@ -113,14 +282,14 @@ def delete_company(company_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.Company: The deleted company.
     """
-    deleted_company = crud.delete_company(db=db, company_id=company_id)
+    deleted_company = await run_crud(db, crud.delete_company, company_id=company_id)
     if deleted_company is None:
         raise HTTPException(status_code=404, detail="Company not found")
     return deleted_company
 
 
 @router.post("/carbon_offsets/", response_model=schemas.CarbonOffset)
-def create_carbon_offset(offset: schemas.CarbonOffsetCreate, db: Session = Depends(get_db)):
+async def create_carbon_offset(offset: schemas.CarbonOffsetCreate, db: Session = Depends(get_db)):
     """
     Create a new carbon offset entry.
 
@@ -134,55 +303,67 @@ def create_carbon_offset(offset: schemas.CarbonOffsetCreate, db: Session = Depen
     Raises:
         HTTPException: If the company with the given ID is not found.
     """
-    db_company = crud.get_company_by_cid(db, company_id=offset.company_id)
-    if db_company is None:
+    db_offset = await run_crud(db, crud.create_carbon_offset, carbon_offset=offset)
+    if db_offset is None:
         raise HTTPException(status_code=400, detail="Invalid company ID")
-    return crud.create_carbon_offset(db=db, carbon_offset=offset)
+    return db_offset
 
 @router.post("/carbon_offset/", response_model=schemas.CarbonOffset)
-def create_carbon_offset(carbon_offset: schemas.CarbonOffsetCreate, db: Session = Depends(get_db)):
-    return crud.create_carbon_offset(db=db, carbon_offset=carbon_offset)
+async def create_carbon_offset(carbon_offset: schemas.CarbonOffsetCreate, db: Session = Depends(get_db)):
+    db_offset = await run_crud(db, crud.create_carbon_offset, carbon_offset=carbon_offset)
+    if db_offset is None:
+        raise HTTPException(status_code=400, detail="Invalid company ID")
+    return db_offset
 
 @router.put("/carbon_offset/{carbon_offset_id}", response_model=schemas.CarbonOffset)
-def update_carbon_offset(
+async def update_carbon_offset(
     carbon_offset_id: int, carbon_offset_update: schemas.CarbonOffsetUpdate, db: Session = Depends(get_db)
 ):
-    updated_offset = crud.update_carbon_offset(db=db, carbon_offset_id=carbon_offset_id, carbon_offset_update=carbon_offset_update)
+    updated_offset = await run_crud(db, crud.update_carbon_offset, carbon_offset_id=carbon_offset_id, carbon_offset_update=carbon_offset_update)
     if updated_offset is None:
         raise HTTPException(status_code=404, detail="Carbon offset not found")
     return updated_offset
 
 @router.delete("/carbon_offset/{carbon_offset_id}", response_model=schemas.CarbonOffset)
-def delete_carbon_offset(carbon_offset_id: int, db: Session = Depends(get_db)):
-    deleted_offset = crud.delete_carbon_offset(db=db, carbon_offset_id=carbon_offset_id)
+async def delete_carbon_offset(carbon_offset_id: int, db: Session = Depends(get_db)):
+    deleted_offset = await run_crud(db, crud.delete_carbon_offset, carbon_offset_id=carbon_offset_id)
     if deleted_offset is None:
         raise HTTPException(status_code=404, detail="Carbon offset not found")
     return deleted_offset
 
 
 @router.get("/companies/{company_id}/carbon_offsets/", response_model=List[schemas.CarbonOffset])
-def read_carbon_offsets(company_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def read_carbon_offsets(company_id: int, request: Request, response: Response, db: Session = Depends(get_read_db), skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     Get all carbon offsets of a specific company.
 
     Args:
         company_id : The company's ID.
         db (Session): SQLAlchemy database session.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
 
     Returns:
         List[schemas.Company]: A list of carbon offset objects.
     Raises:
         HTTPException: If the company with the given ID is not found.
     """
-    db_company = crud.get_company_by_cid(db, company_id=company_id)
+    db_company = await run_crud(db, crud.get_company_by_cid, company_id=company_id)
     if db_company is None:
         raise HTTPException(status_code=400, detail="Company not found")
-    offsets = crud.get_carbon_offsets(db=db, company_id=company_id, skip=skip, limit=limit)
-    return offsets
+    etag = await resource_etag(db, "carbon_offsets", company_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    offsets = await run_crud(
+        db, crud.get_carbon_offsets, company_id=company_id, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        columns=crud.plain_columns(models.CarbonOffset, schemas.CarbonOffset),
+    )
+    set_next_cursor(response, offsets, limit)
+    return plain_json_response(response, offsets, schemas.CarbonOffset)
 
 
 @router.put("/branch/{branch_id}", response_model=schemas.CompanyBranch)
-def update_branch(branch_id: int, branch_update: schemas.CompanyBranchUpdate, db: Session = Depends(get_db)):
+async def update_branch(branch_id: int, branch_update: schemas.CompanyBranchUpdate, db: Session = Depends(get_db)):
     """
     Update an existing branch.
 
@@ -194,7 +375,7 @@ def update_branch(branch_id: int, branch_update: schemas.CompanyBranchUpdate, db
     Returns:
         schemas.CompanyBranch: The updated branch.
     """
-    updated_branch = crud.update_branch(db=db, branch_id=branch_id, branch_update=branch_update)
+    updated_branch = await run_crud(db, crud.update_branch, branch_id=branch_id, branch_update=branch_update)
     if updated_branch is None:
         raise HTTPException(status_code=404, detail="Branch not found")
     return updated_branch
@@ -202,28 +383,37 @@ def update_branch(branch_id: int, branch_update: schemas.CompanyBranchUpdate, db
 
 
 @router.get("/companies/{company_id}/branches/", response_model=List[schemas.CompanyBranch])
-def get_branches(company_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_branches(company_id: int, request: Request, response: Response, db: Session = Depends(get_read_db), skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     Get all the branches of a specific company.
 
     Args:
         company_id : The company's ID.
         db (Session): SQLAlchemy database session.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
 
     Returns:
         List[schemas.CompanyBranch]: A list of carbon offset objects.
     Raises:
         HTTPException: If the company with the given ID is not found.
     """
-    db_company = crud.get_company_by_cid(db, company_id=company_id)
+    db_company = await run_crud(db, crud.get_company_by_cid, company_id=company_id)
     if db_company is None:
         raise HTTPException(status_code=400, detail="Company not found")
-    company_branches = crud.get_company_branches(db=db, company_id=company_id, skip=skip, limit=limit)
-    return company_branches
+    etag = await resource_etag(db, "company_branches", company_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    company_branches = await run_crud(
+        db, crud.get_company_branches, company_id=company_id, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        columns=crud.plain_columns(models.CompanyBranch, schemas.CompanyBranch),
+    )
+    set_next_cursor(response, company_branches, limit)
+    return plain_json_response(response, company_branches, schemas.CompanyBranch)
 
 
 @router.post("/branches/", response_model=schemas.CompanyBranch)
-def create_company_branch(branch: schemas.CompanyBranchCreate, db: Session = Depends(get_db)):
+async def create_company_branch(branch: schemas.CompanyBranchCreate, db: Session = Depends(get_db)):
     """
     Create a new carbon offset entry.
 
@@ -237,18 +427,17 @@ def create_company_branch(branch: schemas.CompanyBranchCreate, db: Session = Dep
     Raises:
         HTTPException: If the company with the given ID is not found.
     """
-    db_company = crud.get_company_by_cid(db, company_id=branch.company_id)
-    if db_company is None:
-        raise HTTPException(status_code=400, detail="Invalid company ID")
-    
     # Not currently possible to get company from branch
     # db_branch = crud.get_company_branch(db, branch_id=branch_id)
     # if db_branch:
     #     raise HTTPException(status_code=400, detail="Branch already exists in DB")
-    return crud.create_company_branch(db=db, company_branch=branch)
+    db_branch = await run_crud(db, crud.create_company_branch, company_branch=branch)
+    if db_branch is None:
+        raise HTTPException(status_code=400, detail="Invalid company ID")
+    return db_branch
 
 @router.delete("/branch/{branch_id}", response_model=schemas.CompanyBranch)
-def delete_branch(branch_id: int, db: Session = Depends(get_db)):
+async def delete_branch(branch_id: int, db: Session = Depends(get_db)):
     """
     Delete an existing branch.
 
@@ -259,35 +448,44 @@ def delete_branch(branch_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.CompanyBranch: The deleted branch.
     """
-    deleted_branch = crud.delete_branch(db=db, branch_id=branch_id)
+    deleted_branch = await run_crud(db, crud.delete_branch, branch_id=branch_id)
     if deleted_branch is None:
         raise HTTPException(status_code=404, detail="Branch not found")
     return deleted_branch
 
 
 @router.get("/branch/{branch_id}/emissionssources/", response_model=List[schemas.CarbonEmissionsSource])
-def get_carbon_emissions_source(branch_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_carbon_emissions_source(branch_id: int, request: Request, response: Response, db: Session = Depends(get_read_db), skip: int = 0, limit: int = 100, cursor: Optional[str] = None):
     """
     Get all the carbon emissions sources from a specific company branch.
 
     Args:
         branch_id : The branch's ID.
         db (Session): SQLAlchemy database session.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
 
     Returns:
         List[schemas.CarbonEmissionsSource]: A list of carbon emission source objects.
     Raises:
         HTTPException: If the branch with the given ID does not exist.
     """
-    db_branch = crud.get_company_branch(db, branch_id=branch_id)
+    db_branch = await run_crud(db, crud.get_company_branch, branch_id=branch_id)
     if db_branch is None:
         raise HTTPException(status_code=400, detail="Invalid branch ID")
-    company_branches = crud.get_carbon_emissions_sources(db=db, branch_id=branch_id, skip=skip, limit=limit)
-    return company_branches
+    etag = await resource_etag(db, "carbon_emissions_sources", branch_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    emissions_sources = await run_crud(
+        db, crud.get_carbon_emissions_sources, branch_id=branch_id, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        columns=crud.plain_columns(models.CarbonEmissionsSource, schemas.CarbonEmissionsSource),
+    )
+    set_next_cursor(response, emissions_sources, limit)
+    return plain_json_response(response, emissions_sources, schemas.CarbonEmissionsSource)
 
 
 @router.post("/emissionssource/", response_model=schemas.CarbonEmissionsSource)
-def create_carbon_emissions_source(emissions_source: schemas.CarbonEmissionsSourceCreate, db: Session = Depends(get_db)):
+async def create_carbon_emissions_source(emissions_source: schemas.CarbonEmissionsSourceCreate, db: Session = Depends(get_db)):
     """
     Create a new carbon offset entry.
 
@@ -301,51 +499,65 @@ def create_carbon_emissions_source(emissions_source: schemas.CarbonEmissionsSour
     Raises:
         HTTPException: If the branch with the given ID is not found.
     """
-    db_branch = crud.get_company_branch(db, branch_id=emissions_source.branch_id)
-    if db_branch is None:
+    db_source = await run_crud(db, crud.create_emissions_source, emissions_source=emissions_source)
+    if db_source is None:
         raise HTTPException(status_code=400, detail="Invalid branch ID")
-    return crud.create_emissions_source(db=db, emissions_source=emissions_source)
+    return db_source
 
 
 @router.get("/emissionssource/{source_id}/footprints/", response_model=List[schemas.CarbonFootprint])
-def get_carbon_footprints(source_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_carbon_footprints(
+    source_id: int, request: Request, response: Response, db: Session = Depends(get_read_db), skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+):
     """
     Get all the footprint transactions of a specific emissions source.
 
     Args:
         source_id : The emissions source's ID.
         db (Session): SQLAlchemy database session.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
+        start (datetime): Only return footprints measured at or after this time.
+        end (datetime): Only return footprints measured before this time.
 
     Returns:
         List[schemas.CarbonFootprint]: A list of carbon footprint objects.
     Raises:
         HTTPException: If the carbon emissions source with the given ID is not found.
     """
-    db_emission_source = crud.get_carbon_emissions_source(db, source_id=source_id)
+    db_emission_source = await run_crud(db, crud.get_carbon_emissions_source, source_id=source_id)
     if db_emission_source is None:
         raise HTTPException(status_code=400, detail="No footprints found")
-    carbon_footprints = crud.get_carbon_footprints(db=db, source_id=source_id, skip=skip, limit=limit)
-    return carbon_footprints
+    etag = await resource_etag(db, "carbon_footprints", source_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    carbon_footprints = await run_crud(
+        db, crud.get_carbon_footprints, source_id=source_id, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        start=start, end=end, columns=crud.plain_columns(models.CarbonFootprint, schemas.CarbonFootprint),
+    )
+    set_next_cursor(response, carbon_footprints, limit)
+    return plain_json_response(response, carbon_footprints, schemas.CarbonFootprint)
 
 @router.put("/emissionssource/{source_id}", response_model=schemas.CarbonEmissionsSource)
-def update_carbon_emissions_source(
+async def update_carbon_emissions_source(
     source_id: int, source_update: schemas.CarbonEmissionsSourceUpdate, db: Session = Depends(get_db)
 ):
-    updated_source = crud.update_carbon_emissions_source(db=db, source_id=source_id, source_update=source_update)
+    updated_source = await run_crud(db, crud.update_carbon_emissions_source, source_id=source_id, source_update=source_update)
     if updated_source is None:
         raise HTTPException(status_code=404, detail="Carbon emissions source not found")
     return updated_source
 
 @router.delete("/emissionssource/{source_id}", response_model=schemas.CarbonEmissionsSource)
-def delete_carbon_emissions_source(source_id: int, db: Session = Depends(get_db)):
-    deleted_source = crud.delete_carbon_emissions_source(db=db, source_id=source_id)
+async def delete_carbon_emissions_source(source_id: int, db: Session = Depends(get_db)):
+    deleted_source = await run_crud(db, crud.delete_carbon_emissions_source, source_id=source_id)
     if deleted_source is None:
         raise HTTPException(status_code=404, detail="Carbon emissions source not found")
     return deleted_source
 
 
 @router.post("/footprint/", response_model=schemas.CarbonFootprint)
-def create_carbon_footprint(footprint: schemas.CarbonFootprintCreate, db: Session = Depends(get_db)):
+async def create_carbon_footprint(footprint: schemas.CarbonFootprintCreate, db: Session = Depends(get_db)):
     """
     Create a new carbon footprint entry.
 
@@ -358,26 +570,63 @@ def create_carbon_footprint(footprint: schemas.CarbonFootprintCreate, db: Sessio
     Raises:
         HTTPException: If the emissions source with the given ID is not found.
     """
-    db_emission_sources = crud.get_carbon_emissions_sources_by_id(db, source_id=footprint.source_id)
-    if db_emission_sources is None:
+    db_footprint = await run_crud(db, crud.create_footprint, footprint=footprint)
+    if db_footprint is None:
         raise HTTPException(status_code=400, detail="Emissions source not found")
-    
-    return crud.create_footprint(db=db, footprint=footprint)
+    return db_footprint
+
+@router.post("/footprints/bulk", response_model=schemas.BulkInsertResult)
+async def bulk_create_carbon_footprints(rows: list = Depends(read_bulk_rows), db: Session = Depends(get_db)):
+    """
+    Create a batch of carbon footprint entries.
+
+    The body is a JSON array or NDJSON stream of CarbonFootprintCreate objects. Invalid rows and
+    rows referencing an unknown emissions source are skipped and reported; the rest are inserted
+    in one transaction.
+
+    Args:
+        rows (list): Rows parsed from the request body.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        BulkInsertResult: The new ID of every row and the per-row errors.
+    """
+    return await run_crud(db, crud.bulk_create_footprints, rows=rows)
+
+# Endpoint to apply a data editor diff to any table
+@router.post("/{table}/batch", response_model=schemas.BatchResult)
+async def apply_batch(table: schemas.BatchTableName, changes: schemas.BatchChanges, response: Response, db: Session = Depends(get_db)):
+    """
+    Apply a whole data editor diff (added, edited and deleted rows) to a table in one transaction.
+
+    Args:
+        table (schemas.BatchTableName): The table to change.
+        changes (schemas.BatchChanges): The rows to add, the changed fields of edited rows by ID,
+            and the IDs to delete. `defaults` are merged into every added row.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        schemas.BatchResult: Whether the diff was applied, and the outcome of every row. If any row
+        is invalid nothing is applied and the status code is 400.
+    """
+    result = await run_crud(db, batch.apply_batch, table=table.value, changes=changes)
+    if not result["applied"]:
+        response.status_code = 400
+    return result
 
-# Endpoint to update an existing carbon footprint entry
 @router.put("/carbon_footprint/{footprint_id}", response_model=schemas.CarbonFootprint)
-def update_carbon_footprint(
+async def update_carbon_footprint(
     footprint_id: int, footprint_update: schemas.CarbonFootprintUpdate, db: Session = Depends(get_db)
 ):
-    updated_footprint = crud.update_footprint(db=db, footprint_id=footprint_id, carbon_footprint_update=footprint_update)
+    updated_footprint = await run_crud(db, crud.update_footprint, footprint_id=footprint_id, carbon_footprint_update=footprint_update)
     if updated_footprint is None:
         raise HTTPException(status_code=404, detail="Carbon footprint not found")
     return updated_footprint
 
 # Endpoint to delete a carbon footprint entry
 @router.delete("/carbon_footprint/{footprint_id}", response_model=schemas.CarbonFootprint)
-def delete_carbon_footprint(footprint_id: int, db: Session = Depends(get_db)):
-    deleted_footprint = crud.delete_carbon_footprint(db=db, footprint_id=footprint_id)
+async def delete_carbon_footprint(footprint_id: int, db: Session = Depends(get_db)):
+    deleted_footprint = await run_crud(db, crud.delete_carbon_footprint, footprint_id=footprint_id)
     if deleted_footprint is None:
         raise HTTPException(status_code=404, detail="Carbon footprint not found")
     return deleted_footprint
@@ -385,28 +634,42 @@ def delete_carbon_footprint(footprint_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/emissionssource/{source_id}/sequestrations/", response_model=List[schemas.CarbonSequestration])
-def get_carbon_sequestrations(source_id: int, db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_carbon_sequestrations(
+    source_id: int, request: Request, response: Response, db: Session = Depends(get_read_db), skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+):
     """
     Get all the sequestration transactions of a specific emissions source.
 
     Args:
         source_id : The emissions source's ID.
         db (Session): SQLAlchemy database session.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
+        start (datetime): Only return sequestrations measured at or after this time.
+        end (datetime): Only return sequestrations measured before this time.
 
     Returns:
         List[schemas.CarbonSequestration]: A list of carbon sequestration objects.
     Raises:
         HTTPException: If the carbon emissions source with the given ID is not found.
     """
-    db_emissions_source = crud.get_emissions_source(db, emission_source_id=source_id)
+    db_emissions_source = await run_crud(db, crud.get_emissions_source, emission_source_id=source_id)
     if db_emissions_source is None:
         raise HTTPException(status_code=400, detail="Emissions source not found")
-    company_branches = crud.get_carbon_sequestrations(db=db, source_id=source_id, skip=skip, limit=limit)
-    return company_branches
+    etag = await resource_etag(db, "carbon_sequestration", source_id)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    carbon_sequestrations = await run_crud(
+        db, crud.get_carbon_sequestrations, source_id=source_id, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        start=start, end=end, columns=crud.plain_columns(models.CarbonSequestration, schemas.CarbonSequestration),
+    )
+    set_next_cursor(response, carbon_sequestrations, limit)
+    return plain_json_response(response, carbon_sequestrations, schemas.CarbonSequestration)
 
 
 @router.post("/sequestration/", response_model=schemas.CarbonSequestration)
-def create_carbon_sequestration(sequestration: schemas.CarbonSequestrationCreate, db: Session = Depends(get_db)):
+async def create_carbon_sequestration(sequestration: schemas.CarbonSequestrationCreate, db: Session = Depends(get_db)):
     """
     Create a new carbon sequestration entry.
 
@@ -419,31 +682,48 @@ def create_carbon_sequestration(sequestration: schemas.CarbonSequestrationCreate
     Raises:
         HTTPException: If the emissions source with the given ID is not found.
     """
-    db_emission_sources = crud.get_carbon_emissions_sources_by_id(db, source_id=sequestration.source_id)
-    if db_emission_sources is None:
+    db_sequestration = await run_crud(db, crud.create_carbon_sequestration, sequestration=sequestration)
+    if db_sequestration is None:
         raise HTTPException(status_code=400, detail="Emissions source not found")
-    
-    return crud.create_carbon_sequestration(db=db, sequestration=sequestration)
+    return db_sequestration
+
+@router.post("/sequestrations/bulk", response_model=schemas.BulkInsertResult)
+async def bulk_create_carbon_sequestrations(rows: list = Depends(read_bulk_rows), db: Session = Depends(get_db)):
+    """
+    Create a batch of carbon sequestration entries.
+
+    The body is a JSON array or NDJSON stream of CarbonSequestrationCreate objects. Invalid rows
+    and rows referencing an unknown emissions source are skipped and reported; the rest are
+    inserted in one transaction.
+
+    Args:
+        rows (list): Rows parsed from the request body.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        BulkInsertResult: The new ID of every row and the per-row errors.
+    """
+    return await run_crud(db, crud.bulk_create_sequestrations, rows=rows)
 
 @router.put("/carbon_sequestration/{seq_id}", response_model=schemas.CarbonSequestrationUpdate)
-def update_carbon_sequestration(
+async def update_carbon_sequestration(
     seq_id: int, seq_update: schemas.CarbonSequestrationUpdate, db: Session = Depends(get_db)
 ):
-    updated_seq = crud.update_sequestration(db=db, seq_id=seq_id, sequestration_update=seq_update)
+    updated_seq = await run_crud(db, crud.update_sequestration, seq_id=seq_id, sequestration_update=seq_update)
     if updated_seq is None:
         raise HTTPException(status_code=404, detail="Carbon sequestration entry not found")
     return updated_seq
 
 # Endpoint to delete a carbon sequestration entry
 @router.delete("/carbon_sequestration/{seq_id}", response_model=schemas.CarbonSequestrationBase)
-def delete_carbon_sequestration(seq_id: int, db: Session = Depends(get_db)):
-    deleted_seq = crud.delete_carbon_sequestration(db=db, seq_id=seq_id)
+async def delete_carbon_sequestration(seq_id: int, db: Session = Depends(get_db)):
+    deleted_seq = await run_crud(db, crud.delete_carbon_sequestration, seq_id=seq_id)
     if deleted_seq is None:
         raise HTTPException(status_code=404, detail="Carbon sequestration entry not found")
     return deleted_seq
 
 @router.post("/regulations/", response_model=schemas.CarbonRegulation)
-def create_regulation(regulation: schemas.CarbonRegulationCreate, db: Session = Depends(get_db)):
+async def create_regulation(regulation: schemas.CarbonRegulationCreate, db: Session = Depends(get_db)):
     """
     Create a new regulation.
 
@@ -456,15 +736,15 @@ def create_regulation(regulation: schemas.CarbonRegulationCreate, db: Session =
     Raises:
         HTTPException: If the regulation with the given name is already present in the database.
     """
-    db_regulation = crud.get_regulation_by_name(db, regulation_name=regulation.regulation_name)
+    db_regulation = await run_crud(db, crud.get_regulation_by_name, regulation_name=regulation.regulation_name)
     if db_regulation:
         raise HTTPException(status_code=400, detail="Regulation already added")
-    return crud.create_carbon_regulation(db=db, regulation=regulation)
+    return await run_crud(db, crud.create_carbon_regulation, regulation=regulation)
 
 
 # Get regulation from id endpoint
 @router.get("/regulations/{regulation_id}", response_model=schemas.CarbonRegulation)
-def get_regulation(regulation_id: int, db: Session = Depends(get_db)):
+async def get_regulation(regulation_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
     """
     Get a regulation from its ID.
 
@@ -473,34 +753,47 @@ def get_regulation(regulation_id: int, db: Session = Depends(get_db)):
         db (Session): SQLAlchemy database session.
 
     Returns:
-        Regulation: The regulation with the specified ID.
+        Regulation: The regulation with the specified ID, or 304 if If-None-Match holds its current ETag.
     Raises:
         HTTPException: If the regulation with the given name is not present in the database.
     """
-    db_regulation = crud.get_regulation_by_id(db, regulation_id=regulation_id)
+    etag = await resource_etag(db, "carbon_regulations")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    db_regulation = await run_crud(db, crud.get_regulation_by_id, regulation_id=regulation_id)
     if db_regulation is None:
         raise HTTPException(status_code=400, detail="Regulation not found")
     return db_regulation
 
 # Get all regulations endpoint
 @router.get("/regulations/", response_model=List[schemas.CarbonRegulation])
-def get_regulations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def get_regulations(request: Request, response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = None, db: Session = Depends(get_read_db)):
     """
     Get all regulations from the database.
 
     Args:
         skip (int): Number of records to skip (for pagination).
         limit (int): Maximum number of records to return.
+        cursor (str): X-Next-Cursor header of the previous page (for keyset pagination).
         db (Session): SQLAlchemy database session.
 
     Returns:
         List[schemas.Regulation]: A list of regulation objects.
     """
-    regulations = crud.get_carbon_regulations(db=db, skip=skip, limit=limit)
-    return regulations
+    etag = await resource_etag(db, "carbon_regulations")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_etag(response, etag)
+    regulations = await run_crud(
+        db, crud.get_carbon_regulations, skip=skip, limit=limit, after_id=decode_cursor(cursor),
+        columns=crud.plain_columns(models.CarbonRegulation, schemas.CarbonRegulation),
+    )
+    set_next_cursor(response, regulations, limit)
+    return plain_json_response(response, regulations, schemas.CarbonRegulation)
 
 @router.put("/regulation/{regulation_id}", response_model=schemas.CarbonRegulation)
-def update_regulation(
+async def update_regulation(
     regulation_id: int, regulation_update: schemas.CarbonRegulationUpdate, db: Session = Depends(get_db)
 ):
     """
@@ -513,14 +806,14 @@ def update_regulation(
     Returns:
         schemas.CarbonRegulation: The updated regulation.
     """
-    updated_regulation = crud.update_regulation(db=db, regulation_id=regulation_id, regulation_update=regulation_update)
+    updated_regulation = await run_crud(db, crud.update_regulation, regulation_id=regulation_id, regulation_update=regulation_update)
     if updated_regulation is None:
         raise HTTPException(status_code=404, detail="Regulation not found")
     return updated_regulation
 
 
 @router.delete("/regulation/{regulation_id}", response_model=schemas.CarbonRegulation)
-def delete_regulation(regulation_id: int, db: Session = Depends(get_db)):
+async def delete_regulation(regulation_id: int, db: Session = Depends(get_db)):
     """
     Delete an existing regulation.
 
@@ -531,14 +824,14 @@ def delete_regulation(regulation_id: int, db: Session = Depends(get_db)):
     Returns:
         schemas.CarbonRegulation: The deleted regulation.
     """
-    deleted_regulation = crud.delete_regulation(db=db, regulation_id=regulation_id)
+    deleted_regulation = await run_crud(db, crud.delete_regulation, regulation_id=regulation_id)
     if deleted_regulation is None:
         raise HTTPException(status_code=404, detail="Regulation not found")
     return deleted_regulation
 
 
 @router.get("/company/{company_id}/summary")
-def get_company_summary(company_id: int, db: Session = Depends(get_db)):
+async def get_company_summary(company_id: int, db: Session = Depends(get_read_db)):
     """
     Get a summary of a company's carbon emissions and offsets.
 
@@ -551,10 +844,48 @@ def get_company_summary(company_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the company with the given ID is not found.
     """
-    return crud.get_company_summary(db, company_id=company_id)
+    return await run_cached(("company_summary", company_id), db, crud.get_company_summary, company_id=company_id)
+
+@router.get("/company/{company_id}/tree")
+async def get_company_tree(
+    company_id: int, depth: int = Query(crud.MAX_TREE_DEPTH, ge=0, le=crud.MAX_TREE_DEPTH), fields: Optional[str] = None,
+    offsets: bool = True, aggregates: bool = False, db: Session = Depends(get_read_db),
+):
+    """
+    Get a company with its branches, offsets and emission sources in one response.
+
+    Args:
+        company_id : The company's ID.
+        depth (int): 0 for the company alone, 1 to add its branches and offsets, 2 to also add every
+            branch's emission sources.
+        fields (str): Comma-separated fields to return besides the IDs, e.g. "c_name,branch_name".
+            All fields are returned when omitted.
+        offsets (bool): Whether to include the company's carbon offsets.
+        aggregates (bool): Whether to add emission and sequestration totals to every node.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        dict: The nested company tree.
+    Raises:
+        HTTPException: If a field is unknown or the company with the given ID is not found.
+    """
+    selected_fields = None
+    if fields is not None:
+        selected_fields = {field.strip() for field in fields.split(",") if field.strip()}
+        known_fields = {field for level_fields in crud.TREE_FIELDS.values() for field in level_fields}
+        unknown_fields = selected_fields - known_fields
+        if unknown_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+    tree = await run_crud(
+        db, crud.get_company_tree, company_id=company_id, depth=depth, fields=selected_fields,
+        offsets=offsets, aggregates=aggregates,
+    )
+    if tree is None:
+        raise HTTPException(status_code=400, detail="Company not found")
+    return tree
 
 @router.get("/baranch/{branch_id}/summary")
-def get_branch_summary(branch_id: int, db: Session = Depends(get_db)):
+async def get_branch_summary(branch_id: int, db: Session = Depends(get_read_db)):
     """
     Get a summary of a company's carbon emissions and offsets.
 
@@ -567,10 +898,56 @@ def get_branch_summary(branch_id: int, db: Session = Depends(get_db)):
     Raises:
         HTTPException: If the branch with the given ID is not found.
     """
-    return crud.get_branch_summary(db, branch_id=branch_id)
+    return await run_cached(("branch_summary", branch_id), db, crud.get_branch_summary, branch_id=branch_id)
+
+@router.get("/company/{company_id}/emissions", response_model=List[schemas.PeriodTotals])
+async def get_company_period_totals(
+    company_id: int, period: schemas.Period = schemas.Period.month,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_read_db),
+):
+    """
+    Get a company's carbon emissions and sequestrations per calendar period.
+
+    Args:
+        company_id : The company's ID.
+        period (schemas.Period): Length of the periods to group by.
+        start (datetime): Only count rows measured at or after this time.
+        end (datetime): Only count rows measured before this time.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        List[schemas.PeriodTotals]: The totals of every period with measurements, oldest first.
+    """
+    return await run_cached(
+        ("company_emissions", company_id, period, start, end), db,
+        crud.get_company_period_totals, company_id=company_id, period=period, start=start, end=end,
+    )
+
+@router.get("/branch/{branch_id}/emissions", response_model=List[schemas.PeriodTotals])
+async def get_branch_period_totals(
+    branch_id: int, period: schemas.Period = schemas.Period.month,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, db: Session = Depends(get_read_db),
+):
+    """
+    Get a branch's carbon emissions and sequestrations per calendar period.
+
+    Args:
+        branch_id : The branch's ID.
+        period (schemas.Period): Length of the periods to group by.
+        start (datetime): Only count rows measured at or after this time.
+        end (datetime): Only count rows measured before this time.
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        List[schemas.PeriodTotals]: The totals of every period with measurements, oldest first.
+    """
+    return await run_cached(
+        ("branch_emissions", branch_id, period, start, end), db,
+        crud.get_branch_period_totals, branch_id=branch_id, period=period, start=start, end=end,
+    )
 
 @router.get("/companies/summary")
-def get_companies_summaries(db: Session = Depends(get_db)):
+async def get_companies_summaries(db: Session = Depends(get_read_db)):
     """
     Get a summary of all companies' carbon emissions and offsets.
 
@@ -580,7 +957,124 @@ def get_companies_summaries(db: Session = Depends(get_db)):
     Returns:
         dict: A dictionary containing all companies' carbon emissions and offsets.
     """
-    return crud.get_companies_summaries(db)
+    return await run_cached(("companies_summary",), db, crud.get_companies_summaries)
+
+
+def export_chunks(session_local, export_format: str, **filters):
+    """
+    Stream the encoded export from its own session, as the response outlives the request's.
+    """
+    db = session_local()
+    try:
+        batches = export.record_batches(export.export_query(db, **filters))
+        yield from export.stream_export(batches, export_format)
+    finally:
+        db.close()
+
+@router.get("/export")
+async def export_measurements(
+    request: Request, format: schemas.ExportFormat = schemas.ExportFormat.parquet, company_id: Optional[int] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+):
+    """
+    Export every footprint and sequestration with its source, branch and company as one table.
+
+    The rows are read through a server-side cursor and encoded batch by batch, so memory use
+    stays bounded however large the export is.
+
+    Args:
+        format (schemas.ExportFormat): "parquet" for a Parquet file, "arrow" for an Arrow IPC stream.
+        company_id (int): Only export this company's rows.
+        start (datetime): Only export rows measured at or after this time.
+        end (datetime): Only export rows measured before this time.
+
+    Returns:
+        StreamingResponse: The encoded export.
+    """
+    extension = "parquet" if format == schemas.ExportFormat.parquet else "arrows"
+    return StreamingResponse(
+        export_chunks(
+            replicas.read_sessionmaker(request, SessionLocal, ReplicaSessionLocals), format.value,
+            company_id=company_id, start=start, end=end,
+        ),
+        media_type=export.EXPORT_FORMATS[format.value],
+        headers={"Content-Disposition": f'attachment; filename="emissions.{extension}"'},
+    )
+
+
+@router.get("/health/live", include_in_schema=False)
+async def get_liveness():
+    """
+    Report that the worker is up and serving, without touching the database.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/health/ready", include_in_schema=False)
+async def get_readiness(response: Response, db: Session = Depends(get_db)):
+    """
+    Report whether the worker can serve requests: the primary answers and its schema is at the Alembic head.
+
+    Returns:
+        dict: The schema status, with a 503 status code when the worker is not ready.
+    """
+    try:
+        status = await run_crud(db, health.schema_status)
+    except (exc.SQLAlchemyError, OSError) as e:
+        response.status_code = 503
+        return {"current": False, "error": f"{type(e).__name__}: {e}"}
+    if not status["current"]:
+        response.status_code = 503
+    return status
+
+
+@router.get("/db/pool", dependencies=[Depends(ops.require_token)])
+async def get_pool_status():
+    """
+    Get the live state of the database connection pools.
+
+    Returns:
+        dict: Checked out, idle and overflow connections and checkout wait times of the
+        primary's pool, with the same for each read replica's pool under "replicas".
+    """
+    if DB_MODE == "async":
+        return {**pool_status(async_engine), "replicas": [pool_status(replica) for replica in async_replica_engines]}
+    return {**pool_status(engine), "replicas": [pool_status(replica) for replica in replica_engines]}
+
+
+@router.get("/db/slow_queries", dependencies=[Depends(ops.require_token)])
+async def get_slow_queries(limit: Optional[int] = Query(default=None, ge=1)):
+    """
+    Get the most recent statements slower than SLOW_QUERY_MS.
+
+    Args:
+        limit (int, optional): Maximum number of entries to return.
+
+    Returns:
+        list: Newest first, each with the route and method that ran it, the duration, the SQL,
+        its parameters if SLOW_QUERY_LOG_PARAMETERS is set, and the EXPLAIN (ANALYZE, BUFFERS)
+        plan once it has been captured.
+    """
+    return slow_queries.slow_query_log.entries(limit)
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(ops.require_token)])
+async def get_metrics():
+    """
+    Expose per-route request, statement and SQL time metrics for Prometheus to scrape.
+    """
+    return metrics.metrics_response()
+
+
+@router.get("/cache/stats", dependencies=[Depends(ops.require_token)])
+async def get_cache_stats():
+    """
+    Get the hit, miss, eviction and invalidation counters of the summary cache.
+
+    Returns:
+        dict: Counters and current size of this worker's summary cache.
+    """
+    return summary_cache.stats()
 
 
 app.include_router(router)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import time
+from contextvars import ContextVar
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from sqlalchemy import event
+
+# Statement counts per request; a jump in a route's buckets points at an N+1 query
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+REQUESTS = Counter("http_requests_total", "Requests handled", ["route", "method", "status"])
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Time spent in the handler", ["route", "method"])
+REQUEST_STATEMENTS = Histogram(
+    "db_statements_per_request", "SQL statements executed per request", ["route", "method"], buckets=STATEMENT_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram("db_time_per_request_seconds", "Time spent executing SQL per request", ["route", "method"])
+STATEMENTS = Counter("db_statements_total", "SQL statements executed", ["route", "method"])
+DB_SECONDS = Counter("db_time_seconds_total", "Time spent executing SQL", ["route", "method"])
+
+
+class RequestStats:
+    """
+    Database work done on behalf of one request.
+    """
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        # The route template, e.g. /company/{company_id}, so label values stay few
+        return getattr(self.request.scope.get("route"), "path", "unmatched")
+
+
+# The stats of the request being handled. Crud functions run in the threadpool or in run_sync,
+# which both carry the request's context, so statements are counted against the right request.
+current_stats = ContextVar("current_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    stats = current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    started = exception_context.connection.info.get("statement_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """
+    Count and time every statement an engine executes against the current request.
+
+    Args:
+        engine: Engine or AsyncEngine to instrument.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+async def track_request(request: Request, call_next):
+    """
+    HTTP middleware recording each request's handler time, statement count and SQL time by route.
+
+    For streamed responses the handler time ends when the body starts streaming.
+    """
+    stats = RequestStats(request)
+    token = current_stats.set(stats)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        current_stats.reset(token)
+        labels = {"route": stats.route, "method": request.method}
+        REQUESTS.labels(status=str(status), **labels).inc()
+        REQUEST_SECONDS.labels(**labels).observe(elapsed)
+        REQUEST_STATEMENTS.labels(**labels).observe(stats.statements)
+        REQUEST_DB_SECONDS.labels(**labels).observe(stats.db_seconds)
+        STATEMENTS.labels(**labels).inc(stats.statements)
+        DB_SECONDS.labels(**labels).inc(stats.db_seconds)
+
+
+def metrics_response() -> Response:
+    """
+    Render every metric in the Prometheus text format.
+
+    Under several worker processes, with PROMETHEUS_MULTIPROC_DIR set, the metrics of all
+    workers are aggregated, whichever worker serves the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,234 @@
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from pydantic import BaseModel, ValidationError, create_model
+from sqlalchemy import Enum, Integer, cast, column, delete, insert, update, values
+from sqlalchemy.orm import Session
+
+from models import models, rollups, schemas
+from models.crud import BULK_CHUNK_SIZE
+
+
+class BatchTable(NamedTuple):
+    """
+    How the batch endpoint applies a data editor diff to one table.
+    """
+
+    model: type
+    # Schema every added row is validated against
+    create_schema: type
+    # Fields an edited row may change
+    editable: tuple
+    # Foreign key every added row must reference an existing parent through
+    parent_key: Optional[str] = None
+    parent_model: Optional[type] = None
+    # (value field, rollup total key, rollup count key) of the measurement tables
+    rollup: Optional[tuple] = None
+
+
+BATCH_TABLES = {
+    "companies": BatchTable(models.Company, schemas.CompanyCreate, ("c_name",)),
+    "branches": BatchTable(
+        models.CompanyBranch, schemas.CompanyBranchCreate, ("branch_name",),
+        parent_key="company_id", parent_model=models.Company,
+    ),
+    "carbon_offsets": BatchTable(
+        models.CarbonOffset, schemas.CarbonOffsetCreate, ("offset_type", "offset_amount", "date"),
+        parent_key="company_id", parent_model=models.Company,
+    ),
+    "emissionssources": BatchTable(
+        models.CarbonEmissionsSource, schemas.CarbonEmissionsSourceCreate, ("source_type", "total_emission_value"),
+        parent_key="branch_id", parent_model=models.CompanyBranch,
+    ),
+    "regulations": BatchTable(models.CarbonRegulation, schemas.CarbonRegulationCreate, ("regulation_name", "description")),
+    "footprints": BatchTable(
+        models.CarbonFootprint, schemas.CarbonFootprintCreate, ("footprint_value",),
+        parent_key="source_id", parent_model=models.CarbonEmissionsSource,
+        rollup=("footprint_value", "footprint_total", "footprint_count"),
+    ),
+    "sequestrations": BatchTable(
+        models.CarbonSequestration, schemas.CarbonSequestrationCreate, ("seq_value",),
+        parent_key="source_id", parent_model=models.CarbonEmissionsSource,
+        rollup=("seq_value", "seq_total", "seq_count"),
+    ),
+}
+
+def _check_enums(model, fields: dict):
+    for name, value in fields.items():
+        column_type = model.__table__.c[name].type
+        if isinstance(column_type, Enum) and value is not None and value not in column_type.enums:
+            raise ValueError(f"{value!r} is not a valid {name}, expected one of {', '.join(column_type.enums)}")
+
+
+@lru_cache(maxsize=None)
+def _edit_schema(create_schema: type, names: tuple) -> type:
+    """
+    Build a schema holding only some fields of a create schema, all of them required.
+    """
+    annotations = {}
+    for schema in reversed(create_schema.__mro__):
+        if issubclass(schema, BaseModel) and schema is not BaseModel:
+            annotations.update(schema.__dict__.get("__annotations__", {}))
+    return create_model(f"{create_schema.__name__}Edit", **{name: (annotations[name], ...) for name in names})
+
+
+def _validate_edit(spec: BatchTable, fields: dict) -> dict:
+    """
+    Validate the changed fields of an edited row against the table's create schema.
+
+    Raises:
+        ValueError: If a field cannot be edited or has an invalid value.
+    """
+    not_editable = sorted(set(fields) - set(spec.editable))
+    if not_editable:
+        raise ValueError(f"Fields cannot be edited: {', '.join(not_editable)}")
+    validated = _edit_schema(spec.create_schema, tuple(sorted(fields))).parse_obj(fields).dict()
+    _check_enums(spec.model, validated)
+    return validated
+
+
+def _update_rows(db: Session, model, edits: dict):
+    """
+    Apply edits with one UPDATE ... FROM (VALUES ...) per distinct set of changed fields.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model: Model to update.
+        edits (dict): Changed fields by row ID.
+    """
+    groups = {}
+    for row_id, fields in edits.items():
+        groups.setdefault(tuple(sorted(fields)), []).append((row_id, fields))
+    table_columns = model.__table__.c
+    for names, rows in groups.items():
+        changes = values(
+            column("id", Integer), *[column(name, table_columns[name].type) for name in names], name="changes",
+        ).data([(row_id, *[fields[name] for name in names]) for row_id, fields in rows])
+        db.execute(
+            update(model)
+            .where(model.id == changes.c.id)
+            # VALUES columns come back untyped, e.g. text instead of an enum
+            .values({name: cast(changes.c[name], table_columns[name].type) for name in names})
+            .execution_options(synchronize_session=False)
+        )
+
+
+def apply_batch(db: Session, table: str, changes: schemas.BatchChanges):
+    """
+    Apply a data editor diff to a table in one transaction.
+
+    Every row is validated first. If any row is invalid nothing is written and the errors are
+    returned; otherwise deletes, edits and additions are applied with set-based statements and
+    the rollups are adjusted in the same transaction.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        table (str): Key of BATCH_TABLES naming the table.
+        changes (schemas.BatchChanges): The added, edited and deleted rows.
+
+    Returns:
+        dict: The schemas.BatchResult, with a result for every row of the diff.
+    """
+    spec = BATCH_TABLES[table]
+    model = spec.model
+    errors = []
+
+    added = []
+    for index, row in enumerate(changes.added):
+        try:
+            item = spec.create_schema.parse_obj({**changes.defaults, **row})
+            _check_enums(model, item.dict())
+        except (ValidationError, ValueError) as e:
+            errors.append({"action": "add", "row": index, "id": None, "detail": str(e)})
+        else:
+            added.append((index, item))
+
+    if spec.parent_key:
+        parent_ids = {getattr(item, spec.parent_key) for _, item in added}
+        known_parent_ids = {
+            parent_id for parent_id, in
+            db.query(spec.parent_model.id).filter(spec.parent_model.id.in_(parent_ids))
+        } if parent_ids else set()
+        for index, item in added:
+            if getattr(item, spec.parent_key) not in known_parent_ids:
+                detail = f"{spec.parent_key} {getattr(item, spec.parent_key)} not found"
+                errors.append({"action": "add", "row": index, "id": None, "detail": detail})
+
+    edited = {}
+    for index, (row_id, fields) in enumerate(changes.edited.items()):
+        try:
+            edited[row_id] = (index, _validate_edit(spec, fields))
+        except (ValidationError, ValueError) as e:
+            errors.append({"action": "edit", "row": index, "id": row_id, "detail": str(e)})
+
+    # Lock the rows being changed, and read their values where the rollups need the difference
+    deleted_ids = set(changes.deleted)
+    target_ids = set(edited) | deleted_ids
+    target_columns = [model.id]
+    if spec.rollup:
+        target_columns += [model.source_id, getattr(model, spec.rollup[0])]
+    targets = {
+        row[0]: row for row in
+        db.query(*target_columns).filter(model.id.in_(target_ids)).with_for_update()
+    } if target_ids else {}
+    for row_id, (index, _) in edited.items():
+        if row_id not in targets:
+            errors.append({"action": "edit", "row": index, "id": row_id, "detail": f"{row_id} not found"})
+        elif row_id in deleted_ids:
+            errors.append({"action": "edit", "row": index, "id": row_id, "detail": f"{row_id} is also deleted"})
+    seen_deleted = set()
+    for index, row_id in enumerate(changes.deleted):
+        # A repeated ID would adjust the rollups once per occurrence but delete the row once
+        if row_id in seen_deleted:
+            errors.append({"action": "delete", "row": index, "id": row_id, "detail": f"{row_id} is deleted more than once"})
+        elif row_id not in targets:
+            errors.append({"action": "delete", "row": index, "id": row_id, "detail": f"{row_id} not found"})
+        seen_deleted.add(row_id)
+
+    if errors:
+        db.rollback()
+        return {"applied": False, "results": errors}
+
+    results = []
+    deltas = {}
+
+    def add_delta(source_id: int, total: float, count: int):
+        _, total_key, count_key = spec.rollup
+        delta = deltas.setdefault(source_id, {})
+        delta[total_key] = delta.get(total_key, 0.0) + (total or 0.0)
+        delta[count_key] = delta.get(count_key, 0) + count
+
+    if changes.deleted:
+        if spec.rollup:
+            for row_id in changes.deleted:
+                _, source_id, value = targets[row_id]
+                add_delta(source_id, -(value or 0.0), -1)
+        elif model is models.CompanyBranch:
+            rollups.remove_branches(db, changes.deleted)
+        elif model is models.CarbonEmissionsSource:
+            rollups.remove_sources(db, changes.deleted)
+        # Rows below deleted companies, branches and sources go with them through ON DELETE CASCADE
+        db.execute(delete(model).where(model.id.in_(changes.deleted)).execution_options(synchronize_session=False))
+        results += [{"action": "delete", "row": index, "id": row_id, "detail": None} for index, row_id in enumerate(changes.deleted)]
+
+    if edited:
+        _update_rows(db, model, {row_id: fields for row_id, (_, fields) in edited.items()})
+        if spec.rollup:
+            value_field = spec.rollup[0]
+            for row_id, (_, fields) in edited.items():
+                if value_field in fields:
+                    _, source_id, old_value = targets[row_id]
+                    add_delta(source_id, (fields[value_field] or 0.0) - (old_value or 0.0), 0)
+        results += [{"action": "edit", "row": index, "id": row_id, "detail": None} for row_id, (index, _) in edited.items()]
+
+    for start in range(0, len(added), BULK_CHUNK_SIZE):
+        chunk = added[start:start + BULK_CHUNK_SIZE]
+        new_ids = db.execute(insert(model).values([item.dict() for _, item in chunk]).returning(model.id)).scalars().all()
+        for (index, item), new_id in zip(chunk, new_ids):
+            results.append({"action": "add", "row": index, "id": new_id, "detail": None})
+            if spec.rollup:
+                add_delta(item.source_id, getattr(item, spec.rollup[0]), 1)
+
+    rollups.apply_deltas(db, deltas)
+    db.commit()
+    return {"applied": True, "results": results}
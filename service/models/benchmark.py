@@ -0,0 +1,215 @@
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func as F, insert
+
+from models import crud, models, rollups, schemas
+from models.database import SessionLocal
+
+
+def time_call(fn, repeat):
+    """
+    Time a callable.
+
+    Args:
+        fn: Callable to time.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        float: Median wall time of the runs, in milliseconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def add_footprints(db, source_id, count, batch_size=10000):
+    """
+    Bulk insert random footprints for one emission source.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        source_id (int): ID of the emission source.
+        count (int): Number of footprints to insert.
+        batch_size (int): Number of rows per INSERT.
+    """
+    for offset in range(0, count, batch_size):
+        rows = [
+            {"source_id": source_id, "footprint_value": random.uniform(10.0, 90.0)}
+            for _ in range(min(batch_size, count - offset))
+        ]
+        db.execute(insert(models.CarbonFootprint), rows)
+        rollups.apply_delta(db, source_id, footprint_total=sum(row["footprint_value"] for row in rows), footprint_count=len(rows))
+    db.commit()
+
+
+def bench_summary(sizes, repeat):
+    """
+    Measure read latency as the number of footprint rows grows.
+
+    Times the company and branch summaries, a recount of the source's footprints from the fact
+    table and fetching the last page of its footprints by cursor. Run it before and after a
+    migration to compare index sets. A throwaway company with one branch and one emission
+    source is created, grown to each size in turn and removed again at the end.
+
+    Args:
+        sizes (list[int]): Footprint row counts to measure at, in increasing order.
+        repeat (int): Number of timed runs per size.
+    """
+    db = SessionLocal()
+    company = crud.create_company(db, schemas.CompanyCreate(c_name="BenchmarkCompany"))
+    try:
+        branch = models.CompanyBranch(company_id=company.id, branch_name="Benchmark Branch")
+        db.add(branch)
+        db.flush()
+        source = models.CarbonEmissionsSource(branch_id=branch.id, source_type="Benchmark", total_emission_value=0.0)
+        db.add(source)
+        db.commit()
+
+        print(f"{'footprints':>12} {'company ms':>12} {'branch ms':>12} {'recount ms':>12} {'page ms':>12}")
+        loaded = 0
+        for size in sizes:
+            add_footprints(db, source.id, size - loaded)
+            loaded = size
+            company_ms = time_call(lambda: crud.get_company_summary(db, company.id), repeat)
+            branch_ms = time_call(lambda: crud.get_branch_summary(db, branch.id), repeat)
+            recount_ms = time_call(
+                lambda: db.query(F.sum(models.CarbonFootprint.footprint_value)).filter(models.CarbonFootprint.source_id == source.id).scalar(),
+                repeat,
+            )
+            last_id = db.query(F.max(models.CarbonFootprint.id)).filter(models.CarbonFootprint.source_id == source.id).scalar()
+            page_ms = time_call(lambda: crud.get_carbon_footprints(db, source.id, limit=100, after_id=last_id - 100), repeat)
+            print(f"{size:>12} {company_ms:>12.2f} {branch_ms:>12.2f} {recount_ms:>12.2f} {page_ms:>12.2f}")
+    finally:
+        db.rollback()
+        crud.delete_company(db, company.id)
+        db.close()
+
+
+def bench_ingest(rows, single_rows, batch_size):
+    """
+    Measure footprint ingestion throughput, one row per call versus bulk batches.
+
+    Args:
+        rows (int): Number of footprints to load through the bulk path.
+        single_rows (int): Number of footprints to load one row per call.
+        batch_size (int): Number of rows per bulk call.
+    """
+    db = SessionLocal()
+    company = crud.create_company(db, schemas.CompanyCreate(c_name="BenchmarkCompany"))
+    try:
+        branch = models.CompanyBranch(company_id=company.id, branch_name="Benchmark Branch")
+        db.add(branch)
+        db.flush()
+        source = models.CarbonEmissionsSource(branch_id=branch.id, source_type="Benchmark", total_emission_value=0.0)
+        db.add(source)
+        db.commit()
+
+        start = time.perf_counter()
+        for _ in range(single_rows):
+            crud.create_footprint(db, schemas.CarbonFootprintCreate(source_id=source.id, footprint_value=random.uniform(10.0, 90.0)))
+        single_rate = single_rows / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for offset in range(0, rows, batch_size):
+            batch = [
+                {"source_id": source.id, "footprint_value": random.uniform(10.0, 90.0)}
+                for _ in range(min(batch_size, rows - offset))
+            ]
+            crud.bulk_create_footprints(db, batch)
+        bulk_rate = rows / (time.perf_counter() - start)
+
+        print(f"{'path':>12} {'rows':>12} {'rows/s':>12}")
+        print(f"{'single':>12} {single_rows:>12} {single_rate:>12.0f}")
+        print(f"{'bulk':>12} {rows:>12} {bulk_rate:>12.0f}")
+    finally:
+        db.rollback()
+        crud.delete_company(db, company.id)
+        db.close()
+
+
+def bench_serialize(rows, repeat):
+    """
+    Measure the time to produce a list response body, through ORM objects and response-model
+    validation versus plain column tuples encoded with orjson.
+
+    Both paths run the same query as the footprint list route and must produce the same JSON.
+
+    Args:
+        rows (int): Number of footprints in the response.
+        repeat (int): Number of timed runs per path.
+
+    Raises:
+        AssertionError: If the two paths produce different JSON.
+    """
+    db = SessionLocal()
+    company = crud.create_company(db, schemas.CompanyCreate(c_name="BenchmarkCompany"))
+    try:
+        branch = models.CompanyBranch(company_id=company.id, branch_name="Benchmark Branch")
+        db.add(branch)
+        db.flush()
+        source = models.CarbonEmissionsSource(branch_id=branch.id, source_type="Benchmark", total_emission_value=0.0)
+        db.add(source)
+        db.commit()
+        add_footprints(db, source.id, rows)
+
+        def orm_body():
+            footprints = crud.get_carbon_footprints(db, source.id, limit=rows)
+            fields = schemas.CarbonFootprint.__fields__
+            validated = [
+                schemas.CarbonFootprint.parse_obj({field: getattr(footprint, field) for field in fields}) for footprint in footprints
+            ]
+            return JSONResponse(jsonable_encoder(validated)).body
+
+        columns = crud.plain_columns(models.CarbonFootprint, schemas.CarbonFootprint)
+
+        def plain_body():
+            footprints = crud.get_carbon_footprints(db, source.id, limit=rows, columns=columns)
+            return crud.plain_json(footprints, schemas.CarbonFootprint)
+
+        assert json.loads(orm_body()) == json.loads(plain_body()), "The plain path changed the response body"
+        orm_ms = time_call(orm_body, repeat)
+        plain_ms = time_call(plain_body, repeat)
+
+        print(f"{'path':>12} {'rows':>12} {'ms':>12} {'speedup':>12}")
+        print(f"{'orm':>12} {rows:>12} {orm_ms:>12.2f} {1:>12.1f}")
+        print(f"{'plain':>12} {rows:>12} {plain_ms:>12.2f} {orm_ms / plain_ms:>12.1f}")
+    finally:
+        db.rollback()
+        crud.delete_company(db, company.id)
+        db.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the service's database access paths.")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="Summary latency as footprint rows grow")
+    summary_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000], help='Footprint row counts to measure at')
+    summary_parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size')
+
+    ingest_parser = subparsers.add_parser("ingest", help="Footprint ingestion throughput")
+    ingest_parser.add_argument('--rows', type=int, default=100000, help='Footprints to load through the bulk path')
+    ingest_parser.add_argument('--single-rows', type=int, default=1000, help='Footprints to load one row per call')
+    ingest_parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk call')
+
+    serialize_parser = subparsers.add_parser("serialize", help="List response encoding, ORM and pydantic versus plain tuples and orjson")
+    serialize_parser.add_argument('--rows', type=int, default=10000, help='Rows in the response')
+    serialize_parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+
+    args = parser.parse_args()
+
+    if args.benchmark == "summary":
+        bench_summary(args.sizes, args.repeat)
+    elif args.benchmark == "ingest":
+        bench_ingest(args.rows, args.single_rows, args.batch_size)
+    elif args.benchmark == "serialize":
+        bench_serialize(args.rows, args.repeat)
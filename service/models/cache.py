@@ -0,0 +1,237 @@
+import logging
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import DDL, create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from models import models  # noqa: F401, registers the summary tables on Base.metadata
+from models.database import Base
+
+logger = logging.getLogger(__name__)
+
+# Tables whose rows feed the summary endpoints; committing a write to any of them drops the cached summaries
+SUMMARY_TABLES = {
+    "companies",
+    "company_branches",
+    "carbon_offsets",
+    "carbon_emissions_sources",
+    "carbon_footprints",
+    "carbon_sequestration",
+    "source_rollups",
+    "branch_rollups",
+    "company_rollups",
+}
+
+# Channel the summary tables' triggers notify, with the table's name, on every write
+NOTIFY_CHANNEL = "summary_changes"
+
+NOTIFY_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION notify_summary_change() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('{NOTIFY_CHANNEL}', TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$
+"""
+
+# Install the triggers when a table is created with metadata.create_all rather than Alembic
+for _table in SUMMARY_TABLES:
+    event.listen(Base.metadata.tables[_table], "after_create", DDL(NOTIFY_FUNCTION_SQL))
+    event.listen(Base.metadata.tables[_table], "after_create", DDL(
+        f"CREATE TRIGGER {_table}_notify_summary_change AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {_table} "
+        "FOR EACH STATEMENT EXECUTE FUNCTION notify_summary_change()"
+    ))
+
+
+class TTLCache:
+    """
+    Thread-safe cache whose entries expire after a fixed time, evicting the least recently used entry when full.
+
+    Every clear() starts a new generation. A value computed from the database is only stored if no
+    clear() happened since its computation began, so a read that raced a write cannot repopulate
+    the cache with a stale value.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        # Set while writes committed by other processes clear the cache (see InvalidationListener)
+        self.listening = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0 and self.listening
+
+    def get(self, key):
+        """
+        Look up a key.
+
+        Returns:
+            tuple: Whether the key was found, and its value (None if not found).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value, generation: int):
+        """
+        Store a value computed during ``generation``, unless the cache has been cleared since.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "listening": self.listening,
+            }
+
+
+summary_cache = TTLCache(
+    maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "30")),
+)
+
+
+class InvalidationListener:
+    """
+    Clears a cache whenever a write to a summary table commits, in any process.
+
+    Listens on NOTIFY_CHANNEL from a connection of its own, in a daemon thread. The cache only
+    serves while the connection is up: it is cleared and disabled when the connection is lost,
+    as notifications sent meanwhile are missed, and enabled again once it is back.
+    """
+
+    def __init__(self, cache: TTLCache, url, retry_seconds: float = 1.0):
+        self.cache = cache
+        self.url = url
+        self.retry_seconds = retry_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start listening; call in every worker process, after forking.
+        """
+        if self._thread is not None or not (self.cache.maxsize > 0 and self.cache.ttl > 0):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="summary-cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        listen_engine = create_engine(self.url, poolclass=NullPool)
+        try:
+            while not self._stop.is_set():
+                try:
+                    self._listen(listen_engine)
+                except Exception:
+                    logger.exception("Summary cache listener lost its connection, retrying")
+                finally:
+                    self.cache.listening = False
+                    self.cache.clear()
+                self._stop.wait(self.retry_seconds)
+        finally:
+            listen_engine.dispose()
+
+    def _listen(self, listen_engine):
+        raw_connection = listen_engine.raw_connection()
+        try:
+            connection = raw_connection.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+            # Writes committed before LISTEN sent no notification to this connection
+            self.cache.clear()
+            self.cache.listening = True
+            while not self._stop.is_set():
+                if select.select([connection], [], [], self.retry_seconds)[0]:
+                    connection.poll()
+                    if connection.notifies:
+                        connection.notifies.clear()
+                        self.cache.clear()
+        finally:
+            raw_connection.close()
+
+
+# Invalidation: every summary table has a trigger notifying NOTIFY_CHANNEL, so writes committed by
+# any worker, or outside the service, clear every listening worker's cache. Notifications arrive
+# shortly after the commit, so sessions also remember whether they wrote to a summary table and
+# clear this worker's cache as soon as that write is committed. This covers ORM flushes as well
+# as the Core INSERT/UPDATE/DELETE statements of the bulk and rollup paths.
+_DIRTY = "summary_cache_dirty"
+
+
+@event.listens_for(Session, "after_flush")
+def _flag_flushed_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if getattr(instance, "__tablename__", None) in SUMMARY_TABLES:
+            session.info[_DIRTY] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_executed_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is None or getattr(table, "name", None) in SUMMARY_TABLES:
+            orm_execute_state.session.info[_DIRTY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    if session.info.pop(_DIRTY, False):
+        summary_cache.clear()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_writes(session):
+    session.info.pop(_DIRTY, None)
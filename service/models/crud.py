@@ -1,7 +1,193 @@
+import enum
+from datetime import datetime
 from http.client import HTTPException
-from sqlalchemy.orm import Session
-from models import models, schemas
-from sqlalchemy import func as F
+from typing import Optional
+import orjson
+from pydantic import VERSION as PYDANTIC_VERSION, ValidationError
+from sqlalchemy.orm import Session, load_only, selectinload
+from models import models, rollups, schemas
+from sqlalchemy import Enum, String, delete, func as F, insert, literal, select, type_coerce, update
+from sqlalchemy.exc import IntegrityError
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+def _page(query, id_column, skip: int, limit: int, after_id: Optional[int]):
+    """
+    Page a list query in ID order.
+
+    Args:
+        query: Query to page.
+        id_column: Primary key column to order and seek on.
+        skip (int): Number of records to skip (for offset pagination).
+        limit (int): Maximum number of records to return.
+        after_id (int): Only return records with an ID above this one (for keyset pagination).
+
+    Returns:
+        list: The records of the page.
+    """
+    if after_id is not None:
+        query = query.filter(id_column > after_id)
+    return query.order_by(id_column).offset(skip).limit(limit).all()
+
+def plain_columns(model, schema) -> list:
+    """
+    Get the columns of a model that make up a response schema, to select them as plain tuples.
+
+    Enum columns are read as their label strings, which is how the schemas render them.
+
+    Args:
+        model: Model to select from, e.g. models.Company.
+        schema: Response schema whose fields to select, e.g. schemas.Company.
+
+    Returns:
+        list: One labelled column per schema field, in field order.
+    """
+    columns = []
+    for field in schema.__fields__:
+        column = getattr(model, field)
+        if isinstance(column.type, Enum):
+            column = type_coerce(column, String)
+        columns.append(column.label(field))
+    return columns
+
+# Response schemas render UTC datetimes with a Z suffix under pydantic 2, and as +00:00 under pydantic 1
+PLAIN_JSON_OPTIONS = 0 if PYDANTIC_VERSION.startswith("1.") else orjson.OPT_UTC_Z
+
+def plain_json(rows: list, schema) -> bytes:
+    """
+    Encode rows selected with plain_columns as the JSON list the response schema renders.
+
+    Args:
+        rows (list): Rows of plain column values, in schema field order.
+        schema: Response schema of one row, e.g. schemas.Company.
+
+    Returns:
+        bytes: The encoded list.
+    """
+    fields = list(schema.__fields__)
+    return orjson.dumps([dict(zip(fields, row)) for row in rows], option=PLAIN_JSON_OPTIONS)
+
+def _select(db: Session, model, columns: Optional[list]):
+    """
+    Start a query for ORM objects of a model, or for plain tuples of some of its columns.
+    """
+    return db.query(*columns) if columns else db.query(model)
+
+def _measured_between(query, measured_at, start: Optional[datetime], end: Optional[datetime]):
+    """
+    Restrict a footprint or sequestration query to a measurement window.
+
+    Bounding measured_at lets Postgres prune the partitions outside the window.
+
+    Args:
+        query: Query to restrict.
+        measured_at: measured_at column of the queried table.
+        start (datetime): Only keep rows measured at or after this time.
+        end (datetime): Only keep rows measured before this time.
+
+    Returns:
+        The restricted query.
+    """
+    if start is not None:
+        query = query.filter(measured_at >= start)
+    if end is not None:
+        query = query.filter(measured_at < end)
+    return query
+
+def _is_foreign_key_violation(error: IntegrityError) -> bool:
+    # psycopg2 reports the SQLSTATE as pgcode, asyncpg as sqlstate
+    return (getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)) == FOREIGN_KEY_VIOLATION
+
+def _returning(db: Session, statement, model, schema, *extra_columns):
+    """
+    Run an INSERT, UPDATE or DELETE and get the written row back from its RETURNING clause.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        statement: The statement to run.
+        model: Model the statement writes to.
+        schema: Response schema whose fields to return, as with plain_columns().
+        *extra_columns: Further columns to return.
+
+    Returns:
+        Row: The written row, or None if the statement matched no row.
+    """
+    return db.execute(statement.returning(*plain_columns(model, schema), *extra_columns)).first()
+
+def _create(db: Session, model, schema, values: dict, **rollup_delta):
+    """
+    Insert a row and commit, in one round trip for the row.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model: Model to insert into.
+        schema: Response schema whose fields to return.
+        values (dict): Column values of the row.
+        **rollup_delta: Change to the rollups of the row's source, for footprints and sequestrations.
+
+    Returns:
+        Row: The new row, or None if its foreign key references no existing parent.
+    """
+    try:
+        row = _returning(db, insert(model).values(**values), model, schema)
+        if rollup_delta:
+            rollups.apply_delta(db, row.source_id, **rollup_delta)
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        if _is_foreign_key_violation(e):
+            return None
+        raise
+    return row
+
+def _update(db: Session, model, schema, row_id: int, values: dict):
+    """
+    Update a row by ID and commit, in one round trip for the row.
+
+    Returns:
+        Row: The updated row, or None if there is no row with the ID.
+    """
+    if values:
+        row = _returning(db, update(model).where(model.id == row_id).values(values), model, schema)
+    else:
+        row = db.query(*plain_columns(model, schema)).filter(model.id == row_id).first()
+    db.commit()
+    return row
+
+def _update_measurement(db: Session, model, schema, row_id: int, value_field: str, value: float, total_key: str, *extra_columns):
+    """
+    Update the value of a footprint or sequestration and its source's rollups, in one round trip for the row.
+
+    The previous value comes back from a locked sub-select in the same UPDATE, so the rollup
+    delta stays right when concurrent updates hit the row.
+
+    Returns:
+        Row: The updated row, or None if there is no row with the ID.
+    """
+    value_column = getattr(model, value_field)
+    old = (
+        select(model.id, model.measured_at, value_column.label("old_value"))
+        .where(model.id == row_id)
+        .with_for_update()
+        .subquery("old")
+    )
+    statement = update(model).where(model.id == old.c.id, model.measured_at == old.c.measured_at).values({value_field: value})
+    row = _returning(db, statement, model, schema, old.c.old_value, *extra_columns)
+    if row is not None:
+        rollups.apply_delta(db, row.source_id, **{total_key: (value or 0.0) - (row.old_value or 0.0)})
+    db.commit()
+    return row
+
+def _delete(db: Session, model, schema, row_id: int):
+    """
+    Delete a row by ID and commit, in one round trip for the row.
+
+    Returns:
+        Row: The deleted row, or None if there was no row with the ID.
+    """
+    row = _returning(db, delete(model).where(model.id == row_id), model, schema)
+    db.commit()
+    return row
 
 # gets company from company ID
 def get_company_by_cid(db: Session, company_id: int):
@@ -12,44 +198,28 @@ def get_company_by_name(db: Session, c_name: str):
     return db.query(models.Company).filter(models.Company.c_name == c_name).first()
 
 # gets all companies 0 - 100
-def get_companies(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Company).offset(skip).limit(limit).all()
+def get_companies(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, columns: Optional[list] = None):
+    return _page(_select(db, models.Company, columns), models.Company.id, skip, limit, after_id)
 
 # creates a company object
 def create_company(db: Session, company: schemas.CompanyCreate):
-    db_company = models.Company(**company.dict())
-    db.add(db_company)
-    db.commit()
-    db.refresh(db_company)
-    return db_company
+    return _create(db, models.Company, schemas.Company, company.dict())
 
 def update_company(db: Session, company_id: int, company_update: schemas.CompanyUpdate):
-    company = db.query(models.Company).filter(models.Company.id == company_id).first()
-    if company:
-        for field, value in company_update.dict(exclude_unset=True).items():
-            setattr(company, field, value)
-        db.commit()
-        db.refresh(company)
-        return company
+    return _update(db, models.Company, schemas.Company, company_id, company_update.dict(exclude_unset=True))
 
 def delete_company(db: Session, company_id: int):
-    company = db.query(models.Company).filter(models.Company.id == company_id).first()
-    if company:
-        db.delete(company)
-        db.commit()
-        return company
+    # One DELETE; offsets, branches and everything below them go through ON DELETE CASCADE
+    return _delete(db, models.Company, schemas.Company, company_id)
 
 #  gets all of the carbon offsets of a particular company given the company ID
-def get_carbon_offsets(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.CarbonOffset).filter(models.CarbonOffset.company_id == company_id).offset(skip).limit(limit).all()
+def get_carbon_offsets(db: Session, company_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, columns: Optional[list] = None):
+    query = _select(db, models.CarbonOffset, columns).filter(models.CarbonOffset.company_id == company_id)
+    return _page(query, models.CarbonOffset.id, skip, limit, after_id)
 
 # creates a carbon offset for a speficied company
 def create_carbon_offset(db: Session, carbon_offset: schemas.CarbonOffsetCreate):
-    db_carbon_offset = models.CarbonOffset(**carbon_offset.dict())
-    db.add(db_carbon_offset)
-    db.commit()
-    db.refresh(db_carbon_offset)
-    return db_carbon_offset
+    return _create(db, models.CarbonOffset, schemas.CarbonOffset, carbon_offset.dict())
 
 def get_carbon_offset(db: Session, carbon_offset_id: int):
     return db.query(models.CarbonOffset).filter(models.CarbonOffset.id == carbon_offset_id).first()
@@ -67,13 +237,7 @@ def update_carbon_offset(db: Session, carbon_offset_id: int, carbon_offset_updat
     Returns:
         CarbonOffset: The updated carbon offset.
     """
-    db_carbon_offset = get_carbon_offset(db, carbon_offset_id)
-    if db_carbon_offset:
-        for field, value in carbon_offset_update.dict(exclude_unset=True).items():
-            setattr(db_carbon_offset, field, value)
-        db.commit()
-        db.refresh(db_carbon_offset)
-    return db_carbon_offset
+    return _update(db, models.CarbonOffset, schemas.CarbonOffset, carbon_offset_id, carbon_offset_update.dict(exclude_unset=True))
 
 def delete_carbon_offset(db: Session, carbon_offset_id: int):
     """
@@ -84,13 +248,9 @@ def delete_carbon_offset(db: Session, carbon_offset_id: int):
         db (Session): SQLAlchemy database session.
 
     Returns:
-        CarbonOffset: The updated carbon offset.
+        CarbonOffset: The deleted carbon offset.
     """
-    db_carbon_offset = get_carbon_offset(db, carbon_offset_id)
-    if db_carbon_offset:
-        db.delete(db_carbon_offset)
-        db.commit()
-    return db_carbon_offset
+    return _delete(db, models.CarbonOffset, schemas.CarbonOffset, carbon_offset_id)
 
 # gets the specified company branch from the branch ID
 def get_company_branch(db: Session, branch_id: int):
@@ -104,95 +264,58 @@ def get_company_branch(db: Session, branch_id: int):
 #     return branch.company
 
 # gets all of the company branches associated with a certain company ID
-def get_company_branches(db: Session, company_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.CompanyBranch).filter(models.CompanyBranch.company_id == company_id).offset(skip).limit(limit).all()
+def get_company_branches(db: Session, company_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, columns: Optional[list] = None):
+    query = _select(db, models.CompanyBranch, columns).filter(models.CompanyBranch.company_id == company_id)
+    return _page(query, models.CompanyBranch.id, skip, limit, after_id)
 
 # creates a company branch associated under a specified company
 def create_company_branch(db: Session, company_branch: schemas.CompanyBranchCreate):
-    db_company_branch = models.CompanyBranch(**company_branch.dict())
-    db.add(db_company_branch)
-    db.commit()
-    db.refresh(db_company_branch)
-    return db_company_branch
+    return _create(db, models.CompanyBranch, schemas.CompanyBranch, company_branch.dict())
 
 def update_branch(db: Session, branch_id: int, branch_update: schemas.CompanyBranchUpdate):
-    branch = db.query(models.CompanyBranch).filter(models.CompanyBranch.id == branch_id).first()
-    if branch:
-        for field, value in branch_update.dict(exclude_unset=True).items():
-            setattr(branch, field, value)
-        db.commit()
-        db.refresh(branch)
-        return branch
+    return _update(db, models.CompanyBranch, schemas.CompanyBranch, branch_id, branch_update.dict(exclude_unset=True))
 
 def delete_branch(db: Session, branch_id: int):
-    branch = db.query(models.CompanyBranch).filter(models.CompanyBranch.id == branch_id).first()
-    if branch:
-        db.delete(branch)
-        db.commit()
-        return branch
+    # A no-op for a missing branch, whose DELETE then returns nothing
+    rollups.remove_branch(db, branch_id)
+    return _delete(db, models.CompanyBranch, schemas.CompanyBranch, branch_id)
 
 # gets all carbon emission sources associated with a specific branch
-def get_carbon_emissions_sources(db: Session, branch_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.CarbonEmissionsSource).filter(models.CarbonEmissionsSource.branch_id == branch_id).offset(skip).limit(limit).all()
+def get_carbon_emissions_sources(db: Session, branch_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, columns: Optional[list] = None):
+    query = _select(db, models.CarbonEmissionsSource, columns).filter(models.CarbonEmissionsSource.branch_id == branch_id)
+    return _page(query, models.CarbonEmissionsSource.id, skip, limit, after_id)
 
 def get_carbon_emissions_sources_by_id(db: Session, source_id: int, skip: int = 0, limit: int = 100):
     return db.query(models.CarbonEmissionsSource).filter(models.CarbonEmissionsSource.id == source_id).offset(skip).limit(limit).all()
 
 
 def create_emissions_source(db: Session, emissions_source: schemas.CarbonEmissionsSourceCreate):
-    db_emissions_source = models.CarbonEmissionsSource(**emissions_source.dict())
-    db.add(db_emissions_source)
-    db.commit()
-    db.refresh(db_emissions_source)
-    return db_emissions_source
+    return _create(db, models.CarbonEmissionsSource, schemas.CarbonEmissionsSource, emissions_source.dict())
 
 def update_carbon_emissions_source(db: Session, source_id: int, source_update: schemas.CarbonEmissionsSourceUpdate):
-    db_source = get_carbon_emissions_source(db, source_id)
-    if db_source:
-        for field, value in source_update.dict(exclude_unset=True).items():
-            setattr(db_source, field, value)
-        db.commit()
-        db.refresh(db_source)
-    return db_source
+    return _update(db, models.CarbonEmissionsSource, schemas.CarbonEmissionsSource, source_id, source_update.dict(exclude_unset=True))
 
 def delete_carbon_emissions_source(db: Session, source_id: int):
-    db_source = get_carbon_emissions_source(db, source_id)
-    if db_source:
-        db.delete(db_source)
-        db.commit()
-    return db_source
+    # A no-op for a missing source, whose DELETE then returns nothing
+    rollups.remove_source(db, source_id)
+    return _delete(db, models.CarbonEmissionsSource, schemas.CarbonEmissionsSource, source_id)
 
 def get_carbon_emissions_source(db: Session, source_id: int):
     return db.query(models.CarbonEmissionsSource).filter(models.CarbonEmissionsSource.id == source_id).first()
 
 
-def get_carbon_regulations(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.CarbonRegulation).offset(skip).limit(limit).all()
+def get_carbon_regulations(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None, columns: Optional[list] = None):
+    return _page(_select(db, models.CarbonRegulation, columns), models.CarbonRegulation.id, skip, limit, after_id)
 
 
 def create_carbon_regulation(db: Session, regulation: schemas.CarbonRegulationCreate):
-    db_regulation = models.CarbonRegulation(**regulation.dict())
-    db.add(db_regulation)
-    db.commit()
-    db.refresh(db_regulation)
-    return db_regulation
+    return _create(db, models.CarbonRegulation, schemas.CarbonRegulation, regulation.dict())
 
 def delete_regulation(db: Session, regulation_id: int):
-    regulation = db.query(models.CarbonRegulation).filter(models.CarbonRegulation.id == regulation_id).first()
-    if regulation:
-        db.delete(regulation)
-        db.commit()
-        return regulation
-    return None
+    return _delete(db, models.CarbonRegulation, schemas.CarbonRegulation, regulation_id)
 
 def update_regulation(db: Session, regulation_id: int, regulation_update: schemas.CarbonRegulationUpdate):
-    regulation = db.query(models.CarbonRegulation).filter(models.CarbonRegulation.id == regulation_id).first()
-    if regulation:
-        regulation.description = regulation_update.description
-        db.commit()
-        db.refresh(regulation)
-        return regulation
-    return None
+    return _update(db, models.CarbonRegulation, schemas.CarbonRegulation, regulation_id, {"description": regulation_update.description})
 
 
 def get_regulation_by_name(db: Session, regulation_name: str):
@@ -201,27 +324,35 @@ def get_regulation_by_name(db: Session, regulation_name: str):
 def get_regulation_by_id(db: Session, regulation_id: str):
     return db.query(models.CarbonRegulation).filter(models.CarbonRegulation.id == regulation_id).first()
 
-def get_carbon_footprints(db: Session, source_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.CarbonFootprint).filter(models.CarbonFootprint.source_id == source_id).offset(skip).limit(limit).all()
+def get_carbon_footprints(
+    db: Session, source_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, columns: Optional[list] = None,
+):
+    query = _select(db, models.CarbonFootprint, columns).filter(models.CarbonFootprint.source_id == source_id)
+    query = _measured_between(query, models.CarbonFootprint.measured_at, start, end)
+    return _page(query, models.CarbonFootprint.id, skip, limit, after_id)
 
 
 def create_footprint(db: Session, footprint: schemas.CarbonFootprintCreate):
-    db_footprint = models.CarbonFootprint(**footprint.dict())
-    db.add(db_footprint)
-    db.commit()
-    db.refresh(db_footprint)
-    return db_footprint
+    return _create(
+        db, models.CarbonFootprint, schemas.CarbonFootprint, footprint.dict(),
+        footprint_total=footprint.footprint_value, footprint_count=1,
+    )
 
-def get_carbon_sequestrations(db: Session, source_id: int, skip: int = 0, limit: int = 100):
-    return db.query(models.CarbonSequestration).filter(models.CarbonSequestration.source_id == source_id).offset(skip).limit(limit).all()
+def get_carbon_sequestrations(
+    db: Session, source_id: int, skip: int = 0, limit: int = 100, after_id: Optional[int] = None,
+    start: Optional[datetime] = None, end: Optional[datetime] = None, columns: Optional[list] = None,
+):
+    query = _select(db, models.CarbonSequestration, columns).filter(models.CarbonSequestration.source_id == source_id)
+    query = _measured_between(query, models.CarbonSequestration.measured_at, start, end)
+    return _page(query, models.CarbonSequestration.id, skip, limit, after_id)
 
 
 def create_carbon_sequestration(db: Session, sequestration: schemas.CarbonSequestrationCreate):
-    db_sequestration = models.CarbonSequestration(**sequestration.dict())
-    db.add(db_sequestration)
-    db.commit()
-    db.refresh(db_sequestration)
-    return db_sequestration
+    return _create(
+        db, models.CarbonSequestration, schemas.CarbonSequestration, sequestration.dict(),
+        seq_total=sequestration.seq_value, seq_count=1,
+    )
 
 def get_emissions_source(db: Session, emission_source_id: int):
     """
@@ -290,23 +421,21 @@ def update_sequestration(db: Session, seq_id: int, sequestration_update: schemas
     Returns:
         models.Sequestration: The updated sequestration entry.
     """
-    carbon_seq = db.query(models.CarbonSequestration).filter(models.CarbonSequestration.id == seq_id).first()
-    if carbon_seq:
-        for field, value in sequestration_update.dict(exclude_unset=True).items():
-            setattr(carbon_seq, field, value)
-        db.commit()
-        db.refresh(carbon_seq)
-    return carbon_seq
+    # The update schema names the value seq_val; it is returned under that name too
+    return _update_measurement(
+        db, models.CarbonSequestration, schemas.CarbonSequestration, seq_id, "seq_value", sequestration_update.seq_val,
+        "seq_total", models.CarbonSequestration.seq_value.label("seq_val"),
+    )
 
 def get_carbon_sequestration(db: Session, seq_id: int):
     return db.query(models.CarbonSequestration).filter(models.CarbonSequestration.id == seq_id).first()
 
 # Function to delete a carbon sequestration entry
 def delete_carbon_sequestration(db: Session, seq_id: int):
-    db_seq = get_carbon_sequestration(db, seq_id)
+    db_seq = _returning(db, delete(models.CarbonSequestration).where(models.CarbonSequestration.id == seq_id), models.CarbonSequestration, schemas.CarbonSequestration)
     if db_seq:
-        db.delete(db_seq)
-        db.commit()
+        rollups.apply_delta(db, db_seq.source_id, seq_total=-(db_seq.seq_value or 0.0), seq_count=-1)
+    db.commit()
     return db_seq
 
 
@@ -322,11 +451,10 @@ def create_carbon_footprint(db: Session, carbon_footprint: schemas.CarbonFootpri
     Returns:
         models.CarbonFootprint: The created carbon footprint entry.
     """
-    db_carbon_footprint = models.CarbonFootprint(**carbon_footprint.dict(), source_id=emission_source_id)
-    db.add(db_carbon_footprint)
-    db.commit()
-    db.refresh(db_carbon_footprint)
-    return db_carbon_footprint
+    return _create(
+        db, models.CarbonFootprint, schemas.CarbonFootprint, {**carbon_footprint.dict(), "source_id": emission_source_id},
+        footprint_total=carbon_footprint.footprint_value, footprint_count=1,
+    )
 
 
 def get_carbon_footprint_by_ids(db: Session, company_id: int, branch_id: int, emission_source_id: int, carbon_footprint_id: int):
@@ -363,13 +491,10 @@ def update_footprint(db: Session, footprint_id: int, carbon_footprint_update: sc
     Returns:
         models.CarbonFootprint: The updated carbon footprint entry.
     """
-    footprint = db.query(models.CarbonFootprint).filter(models.CarbonFootprint.id == footprint_id).first()
-    if footprint:
-        for field, value in carbon_footprint_update.dict(exclude_unset=True).items():
-            setattr(footprint, field, value)
-        db.commit()
-        db.refresh(footprint)
-    return footprint
+    return _update_measurement(
+        db, models.CarbonFootprint, schemas.CarbonFootprint, footprint_id, "footprint_value", carbon_footprint_update.footprint_value,
+        "footprint_total",
+    )
 
 def get_carbon_footprint(db: Session, footprint_id: int):
     return db.query(models.CarbonFootprint).filter(models.CarbonFootprint.id == footprint_id).first()
@@ -377,104 +502,401 @@ def get_carbon_footprint(db: Session, footprint_id: int):
 
 # Function to delete a carbon footprint entry
 def delete_carbon_footprint(db: Session, footprint_id: int):
-    db_footprint = get_carbon_footprint(db, footprint_id)
+    db_footprint = _returning(db, delete(models.CarbonFootprint).where(models.CarbonFootprint.id == footprint_id), models.CarbonFootprint, schemas.CarbonFootprint)
     if db_footprint:
-        db.delete(db_footprint)
-        db.commit()
+        rollups.apply_delta(db, db_footprint.source_id, footprint_total=-(db_footprint.footprint_value or 0.0), footprint_count=-1)
+    db.commit()
     return db_footprint
 
-def get_company_summary(db: Session, company_id: int):
+def _rollup_summary(db: Session, rollup, key_criterion, **extra_totals):
     """
-    Get a summary of a company's carbon emissions and sequestrations.
+    Read a summary from a single rollup row in one statement.
 
     Args:
         db (Session): SQLAlchemy database session.
-        company_id (int): ID of the company.
+        rollup: Rollup model to read, e.g. models.CompanyRollup.
+        key_criterion: Primary-key filter selecting the rollup row.
+        **extra_totals: Additional scalar subqueries to evaluate in the same statement, by result key.
 
     Returns:
-        dict: Summary of the company's carbon emissions and sequestrations.
+        dict: The total carbon emissions and sequestrations, plus the extra totals. Totals are
+        zero when nothing has been recorded yet.
     """
-    # Get the company's branches
-    branches = get_company_branches(db, company_id)
-    branch_ids = [branch.id for branch in branches]
+    lookup = db.query(rollup).filter(key_criterion)
+    totals = db.query(
+        F.coalesce(lookup.with_entities(rollup.footprint_total).scalar_subquery(), 0.0).label("total_emissions"),
+        F.coalesce(lookup.with_entities(rollup.seq_total).scalar_subquery(), 0.0).label("total_sequestrations"),
+        *[subquery.label(key) for key, subquery in extra_totals.items()],
+    ).one()
 
-    # Get the company's carbon emissions sources
-    emissions_sources = db.query(models.CarbonEmissionsSource).filter(models.CarbonEmissionsSource.branch_id.in_(branch_ids)).all()
-    emission_source_ids = [source.id for source in emissions_sources]
+    return dict(totals._mapping)
 
-    # Get the company's carbon footprints
-    footprints = db.query(models.CarbonFootprint).filter(models.CarbonFootprint.source_id.in_(emission_source_ids)).all()
+def get_company_summary(db: Session, company_id: int):
+    """
+    Get a summary of a company's carbon emissions, sequestrations and offsets.
 
-    # Get the company's carbon sequestrations
-    sequestrations = db.query(models.CarbonSequestration).filter(models.CarbonSequestration.source_id.in_(emission_source_ids)).all()
+    Every total covers all of the company's rows, however many branches and sources it has.
 
-    # Calculate the total carbon emissions and sequestrations
-    total_emissions = sum([footprint.footprint_value for footprint in footprints])
-    total_sequestrations = sum([sequestration.seq_value for sequestration in sequestrations])
+    Args:
+        db (Session): SQLAlchemy database session.
+        company_id (int): ID of the company.
 
-    return {
-        "total_emissions": total_emissions,
-        "total_sequestrations": total_sequestrations
-    }
+    Returns:
+        dict: Summary of the company's carbon emissions, sequestrations, branch count and offsets.
+    """
+    number_of_branches = (
+        db.query(F.count(models.CompanyBranch.id))
+        .filter(models.CompanyBranch.company_id == company_id)
+        .scalar_subquery()
+    )
+    total_offsets = (
+        db.query(F.coalesce(F.sum(models.CarbonOffset.offset_amount), 0))
+        .filter(models.CarbonOffset.company_id == company_id)
+        .scalar_subquery()
+    )
+    return _rollup_summary(
+        db, models.CompanyRollup, models.CompanyRollup.company_id == company_id,
+        number_of_branches=number_of_branches, total_offsets=total_offsets,
+    )
 
 def get_branch_summary(db: Session, branch_id: int):
     """
     Get a summary of a branch's carbon emissions and sequestrations.
 
+    Every total covers all of the branch's rows, however many sources it has.
+
     Args:
         db (Session): SQLAlchemy database session.
         branch_id (int): ID of the branch.
 
     Returns:
-        dict: Summary of the branch's carbon emissions and sequestrations.
+        dict: Summary of the branch's carbon emissions, sequestrations and source count.
     """
-    # Get the branch's carbon emissions sources
-    emissions_sources = get_carbon_emissions_sources(db, branch_id)
-    emission_source_ids = [source.id for source in emissions_sources]
-
-    # Get the branch's carbon footprints
-    footprints = db.query(models.CarbonFootprint).filter(models.CarbonFootprint.source_id.in_(emission_source_ids)).all()
+    number_of_sources = (
+        db.query(F.count(models.CarbonEmissionsSource.id))
+        .filter(models.CarbonEmissionsSource.branch_id == branch_id)
+        .scalar_subquery()
+    )
+    return _rollup_summary(
+        db, models.BranchRollup, models.BranchRollup.branch_id == branch_id,
+        number_of_sources=number_of_sources,
+    )
 
-    # Get the branch's carbon sequestrations
-    sequestrations = db.query(models.CarbonSequestration).filter(models.CarbonSequestration.source_id.in_(emission_source_ids)).all()
+def get_companies_summaries(db: Session):
+    """
+    Get the total carbon emissions and sequestrations of every company.
 
-    # Calculate the total carbon emissions and sequestrations
-    total_emissions = sum([footprint.footprint_value for footprint in footprints])
-    total_sequestrations = sum([sequestration.seq_value for sequestration in sequestrations])
+    Args:
+        db (Session): SQLAlchemy database session.
 
+    Returns:
+        dict: Total footprints and total sequestrations by company name. Companies without any
+        footprints or sequestrations are left out of the respective mapping.
+    """
+    totals = (
+        db.query(
+            models.Company.c_name,
+            models.CompanyRollup.footprint_total,
+            models.CompanyRollup.footprint_count,
+            models.CompanyRollup.seq_total,
+            models.CompanyRollup.seq_count,
+        )
+        .join(models.CompanyRollup, models.CompanyRollup.company_id == models.Company.id)
+        .all()
+    )
     return {
-        "total_emissions": total_emissions,
-        "total_sequestrations": total_sequestrations
+        "footprints": {c_name: footprint_total for c_name, footprint_total, footprint_count, _, _ in totals if footprint_count > 0},
+        "sequestrations": {c_name: seq_total for c_name, _, _, seq_total, seq_count in totals if seq_count > 0},
     }
 
-def get_companies_summaries(db:Session):
-    footprints = (
-        (
+def _period_totals(db: Session, key_column, key: int, period: schemas.Period, start: Optional[datetime], end: Optional[datetime]):
+    """
+    Total the emissions and sequestrations under one company or branch per calendar period.
+
+    Both fact tables are read in a single statement, each bounded to the window so only the
+    partitions that overlap it are scanned.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        key_column: Column identifying the scope, e.g. models.CompanyBranch.company_id.
+        key (int): ID of the company or branch.
+        period (schemas.Period): Length of the periods to group by.
+        start (datetime): Only count rows measured at or after this time.
+        end (datetime): Only count rows measured before this time.
+
+    Returns:
+        list: One dict per period that has rows, in chronological order.
+    """
+    def measurements(model, emissions, sequestrations):
+        query = (
             db.query(
-                models.Company.c_name,
-                F.sum(models.CarbonFootprint.footprint_value).label("total_footprint"),
+                F.date_trunc(period.value, model.measured_at).label("period_start"),
+                emissions.label("emissions"),
+                sequestrations.label("sequestrations"),
             )
-            .join(models.CompanyBranch)
-            .join(models.CarbonEmissionsSource)
-            .join(models.CarbonFootprint)
+            .join(models.CarbonEmissionsSource, models.CarbonEmissionsSource.id == model.source_id)
+            .join(models.CompanyBranch, models.CompanyBranch.id == models.CarbonEmissionsSource.branch_id)
+            .filter(key_column == key)
         )
-        .group_by(models.Company.id)
-        .all()
+        return _measured_between(query, model.measured_at, start, end)
+
+    footprints = measurements(
+        models.CarbonFootprint, models.CarbonFootprint.footprint_value, literal(0.0),
     )
-    sequestrations = (
-        (
-            db.query(
-                models.Company.c_name,
-                F.sum(models.CarbonSequestration.seq_value).label("total_seq"),
-            )
-            .join(models.CompanyBranch)
-            .join(models.CarbonEmissionsSource)
-            .join(models.CarbonSequestration)
+    sequestrations = measurements(
+        models.CarbonSequestration, literal(0.0), models.CarbonSequestration.seq_value,
+    )
+    rows = footprints.union_all(sequestrations).subquery()
+    totals = (
+        db.query(
+            rows.c.period_start,
+            F.coalesce(F.sum(rows.c.emissions), 0.0).label("total_emissions"),
+            F.coalesce(F.sum(rows.c.sequestrations), 0.0).label("total_sequestrations"),
         )
-        .group_by(models.Company.id)
+        .group_by(rows.c.period_start)
+        .order_by(rows.c.period_start)
         .all()
     )
+    return [dict(row._mapping) for row in totals]
+
+def get_company_period_totals(
+    db: Session, company_id: int, period: schemas.Period,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+):
+    """
+    Get a company's carbon emissions and sequestrations per calendar period.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        company_id (int): ID of the company.
+        period (schemas.Period): Length of the periods to group by.
+        start (datetime): Only count rows measured at or after this time.
+        end (datetime): Only count rows measured before this time.
+
+    Returns:
+        list: Totals of every period with measurements, in chronological order.
+    """
+    return _period_totals(db, models.CompanyBranch.company_id, company_id, period, start, end)
+
+def get_branch_period_totals(
+    db: Session, branch_id: int, period: schemas.Period,
+    start: Optional[datetime] = None, end: Optional[datetime] = None,
+):
+    """
+    Get a branch's carbon emissions and sequestrations per calendar period.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        branch_id (int): ID of the branch.
+        period (schemas.Period): Length of the periods to group by.
+        start (datetime): Only count rows measured at or after this time.
+        end (datetime): Only count rows measured before this time.
+
+    Returns:
+        list: Totals of every period with measurements, in chronological order.
+    """
+    return _period_totals(db, models.CompanyBranch.id, branch_id, period, start, end)
+
+# Scalar fields each level of a company tree can return, besides its id
+TREE_FIELDS = {
+    "company": ["c_name"],
+    "offset": ["offset_type", "offset_amount", "date"],
+    "branch": ["branch_name"],
+    "source": ["source_type", "total_emission_value"],
+}
+
+# Deepest tree level: 0 is the company alone, 1 adds its branches and offsets, 2 the branches' sources
+MAX_TREE_DEPTH = 2
+
+def _tree_columns(model, level: str, fields: Optional[set], *keys):
+    """
+    Get the columns to load for one tree level: its key columns plus the selected fields.
+    """
+    names = [name for name in TREE_FIELDS[level] if fields is None or name in fields]
+    return names, [getattr(model, key) for key in ("id",) + keys] + [getattr(model, name) for name in names]
+
+def _tree_node(obj, names: list) -> dict:
+    node = {"id": obj.id}
+    for name in names:
+        value = getattr(obj, name)
+        node[name] = value.name if isinstance(value, enum.Enum) else value
+    return node
+
+def _rollup_totals(db: Session, rollup, key_column, keys: list) -> dict:
+    """
+    Read the emission and sequestration totals of many rollup rows in one query, by key.
+    """
+    if not keys:
+        return {}
+    rows = db.query(key_column, rollup.footprint_total, rollup.seq_total).filter(key_column.in_(keys)).all()
+    return {key: {"total_emissions": emissions, "total_sequestrations": sequestrations} for key, emissions, sequestrations in rows}
+
+def get_company_tree(
+    db: Session, company_id: int, depth: int = MAX_TREE_DEPTH, fields: Optional[set] = None,
+    offsets: bool = True, aggregates: bool = False,
+):
+    """
+    Get a company with its branches, offsets and emission sources as one nested document.
+
+    Every level is loaded with a single selectin query, however many branches and sources
+    there are, and only the requested columns are read.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        company_id (int): ID of the company.
+        depth (int): 0 for the company alone, 1 to add its branches (and offsets), 2 to add the
+            emission sources of every branch.
+        fields (set): Names from TREE_FIELDS to return at every level, or None for all of them.
+        offsets (bool): Whether to include the company's carbon offsets (from depth 1).
+        aggregates (bool): Whether to add a summary with the rollup totals to the company and
+            every branch and source in the tree.
+
+    Returns:
+        dict: The company tree, or None if the company does not exist.
+    """
+    company_fields, company_columns = _tree_columns(models.Company, "company", fields)
+    branch_fields, branch_columns = _tree_columns(models.CompanyBranch, "branch", fields, "company_id")
+    source_fields, source_columns = _tree_columns(models.CarbonEmissionsSource, "source", fields, "branch_id")
+    offset_fields, offset_columns = _tree_columns(models.CarbonOffset, "offset", fields, "company_id")
+
+    options = [load_only(*company_columns)]
+    if depth >= 1:
+        branches = selectinload(models.Company.branches).load_only(*branch_columns)
+        if depth >= 2:
+            branches = branches.selectinload(models.CompanyBranch.emission_sources).load_only(*source_columns)
+        options.append(branches)
+        if offsets:
+            options.append(selectinload(models.Company.carbon_offsets).load_only(*offset_columns))
+
+    company = db.query(models.Company).options(*options).filter(models.Company.id == company_id).first()
+    if company is None:
+        return None
+
+    tree = _tree_node(company, company_fields)
+    if aggregates:
+        tree["summary"] = get_company_summary(db, company_id)
+    if depth < 1:
+        return tree
+
+    if offsets:
+        tree["carbon_offsets"] = [_tree_node(offset, offset_fields) for offset in sorted(company.carbon_offsets, key=lambda offset: offset.id)]
+
+    branches = sorted(company.branches, key=lambda branch: branch.id)
+    sources = [source for branch in branches for source in branch.emission_sources] if depth >= 2 else []
+    if aggregates:
+        branch_totals = _rollup_totals(db, models.BranchRollup, models.BranchRollup.branch_id, [branch.id for branch in branches])
+        source_counts = dict(
+            db.query(models.CarbonEmissionsSource.branch_id, F.count(models.CarbonEmissionsSource.id))
+            .filter(models.CarbonEmissionsSource.branch_id.in_([branch.id for branch in branches]))
+            .group_by(models.CarbonEmissionsSource.branch_id)
+            .all()
+        ) if branches else {}
+        source_totals = _rollup_totals(db, models.SourceRollup, models.SourceRollup.source_id, [source.id for source in sources])
+
+    empty_totals = {"total_emissions": 0.0, "total_sequestrations": 0.0}
+    tree["branches"] = []
+    for branch in branches:
+        node = _tree_node(branch, branch_fields)
+        if aggregates:
+            node["summary"] = {**branch_totals.get(branch.id, empty_totals), "number_of_sources": source_counts.get(branch.id, 0)}
+        if depth >= 2:
+            node["emission_sources"] = []
+            for source in sorted(branch.emission_sources, key=lambda source: source.id):
+                source_node = _tree_node(source, source_fields)
+                if aggregates:
+                    source_node["summary"] = source_totals.get(source.id, empty_totals)
+                node["emission_sources"].append(source_node)
+        tree["branches"].append(node)
+    return tree
+
+# rows per multi-row INSERT, well below Postgres' 65535 bind parameter limit
+BULK_CHUNK_SIZE = 5000
+
+def _bulk_insert(db: Session, model, create_schema, rows: list, rollup_delta):
+    """
+    Validate and insert a batch of rows that each reference an emission source.
+
+    Rows that fail validation or reference an unknown source are reported and skipped; the
+    others are inserted with multi-row INSERT ... RETURNING statements and added to the
+    rollups, all in one transaction.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        model: Model to insert into, e.g. models.CarbonFootprint.
+        create_schema: Schema each row is validated against.
+        rows (list): Parsed JSON rows.
+        rollup_delta: Function mapping a validated row to its rollup change.
+
+    Returns:
+        dict: Number of rows inserted, the new ID of every input row (None where it was
+        skipped) and the per-row errors.
+    """
+    valid, errors = [], []
+    for index, row in enumerate(rows):
+        try:
+            valid.append((index, create_schema.parse_obj(row)))
+        except ValidationError as e:
+            errors.append({"row": index, "detail": str(e)})
+
+    source_ids = {item.source_id for _, item in valid}
+    known_source_ids = {
+        source_id for source_id, in
+        db.query(models.CarbonEmissionsSource.id).filter(models.CarbonEmissionsSource.id.in_(source_ids))
+    } if source_ids else set()
+    for index, item in valid:
+        if item.source_id not in known_source_ids:
+            errors.append({"row": index, "detail": f"Emissions source {item.source_id} not found"})
+    valid = [(index, item) for index, item in valid if item.source_id in known_source_ids]
+
+    ids = [None] * len(rows)
+    deltas = {}
+    for start in range(0, len(valid), BULK_CHUNK_SIZE):
+        chunk = valid[start:start + BULK_CHUNK_SIZE]
+        new_ids = db.execute(
+            insert(model).values([item.dict() for _, item in chunk]).returning(model.id)
+        ).scalars().all()
+        for (index, item), new_id in zip(chunk, new_ids):
+            ids[index] = new_id
+            delta = deltas.setdefault(item.source_id, {})
+            for field, value in rollup_delta(item).items():
+                delta[field] = delta.get(field, 0) + value
+    rollups.apply_deltas(db, deltas)
+    db.commit()
+
     return {
-        "footprints": {company_id: total_footprint for company_id, total_footprint in footprints},
-        "sequestrations": {company_id: total_seq for company_id, total_seq in sequestrations},
+        "inserted": len(valid),
+        "ids": ids,
+        "errors": sorted(errors, key=lambda error: error["row"]),
     }
+
+def bulk_create_footprints(db: Session, rows: list):
+    """
+    Insert a batch of carbon footprints.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        rows (list): Parsed JSON rows, each shaped like schemas.CarbonFootprintCreate.
+
+    Returns:
+        dict: The schemas.BulkInsertResult of the batch.
+    """
+    return _bulk_insert(
+        db, models.CarbonFootprint, schemas.CarbonFootprintCreate, rows,
+        lambda item: {"footprint_total": item.footprint_value, "footprint_count": 1},
+    )
+
+def bulk_create_sequestrations(db: Session, rows: list):
+    """
+    Insert a batch of carbon sequestrations.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        rows (list): Parsed JSON rows, each shaped like schemas.CarbonSequestrationCreate.
+
+    Returns:
+        dict: The schemas.BulkInsertResult of the batch.
+    """
+    return _bulk_insert(
+        db, models.CarbonSequestration, schemas.CarbonSequestrationCreate, rows,
+        lambda item: {"seq_total": item.seq_value, "seq_count": 1},
+    )
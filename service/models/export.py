@@ -0,0 +1,221 @@
+import argparse
+import datetime
+from itertools import islice
+from typing import Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import literal
+from sqlalchemy.orm import Session
+
+from models import models
+
+# rows fetched per round trip from the server-side cursor and written per Arrow record batch
+EXPORT_BATCH_SIZE = 50000
+
+# One row per footprint or sequestration, with its source, branch and company alongside
+EXPORT_SCHEMA = pa.schema([
+    ("company_id", pa.int32()),
+    ("company_name", pa.string()),
+    ("branch_id", pa.int32()),
+    ("branch_name", pa.string()),
+    ("source_id", pa.int32()),
+    ("source_type", pa.string()),
+    ("kind", pa.dictionary(pa.int8(), pa.string())),
+    ("measurement_id", pa.int32()),
+    ("value", pa.float64()),
+    ("measured_at", pa.timestamp("us", tz="UTC")),
+])
+
+EXPORT_FORMATS = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _measurements(db: Session, model, kind: str, value_column):
+    return (
+        db.query(
+            models.Company.id.label("company_id"),
+            models.Company.c_name.label("company_name"),
+            models.CompanyBranch.id.label("branch_id"),
+            models.CompanyBranch.branch_name,
+            models.CarbonEmissionsSource.id.label("source_id"),
+            models.CarbonEmissionsSource.source_type,
+            literal(kind).label("kind"),
+            model.id.label("measurement_id"),
+            value_column.label("value"),
+            model.measured_at,
+        )
+        .select_from(model)
+        .join(models.CarbonEmissionsSource, models.CarbonEmissionsSource.id == model.source_id)
+        .join(models.CompanyBranch, models.CompanyBranch.id == models.CarbonEmissionsSource.branch_id)
+        .join(models.Company, models.Company.id == models.CompanyBranch.company_id)
+    )
+
+
+def export_query(
+    db: Session, company_id: Optional[int] = None,
+    start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+):
+    """
+    Build the query of the denormalized export, footprints and sequestrations in one statement.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        company_id (int): Only export this company's rows.
+        start (datetime): Only export rows measured at or after this time.
+        end (datetime): Only export rows measured before this time.
+
+    Returns:
+        Query: Rows in EXPORT_SCHEMA column order.
+    """
+    queries = []
+    for model, kind, value_column in (
+        (models.CarbonFootprint, "footprint", models.CarbonFootprint.footprint_value),
+        (models.CarbonSequestration, "sequestration", models.CarbonSequestration.seq_value),
+    ):
+        query = _measurements(db, model, kind, value_column)
+        if company_id is not None:
+            query = query.filter(models.CompanyBranch.company_id == company_id)
+        if start is not None:
+            query = query.filter(model.measured_at >= start)
+        if end is not None:
+            query = query.filter(model.measured_at < end)
+        queries.append(query)
+    return queries[0].union_all(queries[1])
+
+
+def record_batches(query, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Stream the rows of an export query as Arrow record batches.
+
+    The rows come from a server-side cursor, so at most one batch is held in memory at a time.
+
+    Args:
+        query: Query from export_query().
+        batch_size (int): Rows per record batch.
+
+    Yields:
+        pa.RecordBatch: The next batch of rows, in EXPORT_SCHEMA.
+    """
+    rows = iter(query.yield_per(batch_size))
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        columns = zip(*batch)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, EXPORT_SCHEMA)],
+            schema=EXPORT_SCHEMA,
+        )
+
+
+class _ChunkSink:
+    """
+    Write-only file object collecting what a writer wrote since the chunks were last taken.
+    """
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _open_writer(sink, export_format: str):
+    if export_format == "arrow":
+        return pa.ipc.new_stream(sink, EXPORT_SCHEMA)
+    if export_format == "parquet":
+        return pq.ParquetWriter(sink, EXPORT_SCHEMA, compression="zstd")
+    raise ValueError(f"Unknown export format {export_format!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def _write(writer, batch: pa.RecordBatch, export_format: str):
+    if export_format == "parquet":
+        # One row group per batch, so each can be flushed to the client as soon as it is encoded
+        writer.write_table(pa.Table.from_batches([batch]))
+    else:
+        writer.write_batch(batch)
+
+
+def stream_export(batches: Iterator[pa.RecordBatch], export_format: str) -> Iterator[bytes]:
+    """
+    Encode record batches as an Arrow IPC stream or a Parquet file, chunk by chunk.
+
+    Args:
+        batches: Record batches from record_batches().
+        export_format (str): "arrow" or "parquet".
+
+    Yields:
+        bytes: The encoded file, one chunk per batch.
+    """
+    sink = _ChunkSink()
+    writer = _open_writer(sink, export_format)
+    for batch in batches:
+        _write(writer, batch, export_format)
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+def export_to_file(db: Session, path: str, export_format: str, **filters) -> int:
+    """
+    Write the export to a local file.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        path (str): File to write.
+        export_format (str): "arrow" or "parquet".
+        **filters: Filters of export_query().
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = 0
+    with pa.OSFile(path, "wb") as sink:
+        writer = _open_writer(sink, export_format)
+        for batch in record_batches(export_query(db, **filters)):
+            _write(writer, batch, export_format)
+            rows += batch.num_rows
+        writer.close()
+    return rows
+
+
+if __name__ == '__main__':
+    from models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Export every footprint and sequestration with its source, branch and company.")
+    parser.add_argument('path', help='File to write')
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default="parquet", help='Output format')
+    parser.add_argument('--company-id', type=int, help='Only export this company')
+    parser.add_argument('--start', type=datetime.datetime.fromisoformat, help='Only export rows measured at or after this time')
+    parser.add_argument('--end', type=datetime.datetime.fromisoformat, help='Only export rows measured before this time')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = export_to_file(db, args.path, args.format, company_id=args.company_id, start=args.start, end=args.end)
+        print(f"Wrote {rows} rows to {args.path}")
+    finally:
+        db.close()
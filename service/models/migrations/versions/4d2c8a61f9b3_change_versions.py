@@ -0,0 +1,95 @@
+"""change versions
+
+Adds the change_versions table behind the ETags of the GET routes, and statement-level
+triggers that bump the version of every table or parent scope a statement touched.
+
+Revision ID: 4d2c8a61f9b3
+Revises: e5a19c7b3f60
+Create Date: 2026-10-18 15:21:36.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d2c8a61f9b3'
+down_revision: Union[str, None] = 'e5a19c7b3f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> column scoping its versions, None for one version per table
+VERSIONED_TABLES = {
+    'companies': None,
+    'carbon_regulations': None,
+    'carbon_offsets': 'company_id',
+    'company_branches': 'company_id',
+    'carbon_emissions_sources': 'branch_id',
+    'carbon_footprints': 'source_id',
+    'carbon_sequestration': 'source_id',
+}
+
+TRIGGER_EVENTS = {
+    'insert': 'INSERT ON {table} REFERENCING NEW TABLE AS new_rows',
+    'update': 'UPDATE ON {table} REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows',
+    'delete': 'DELETE ON {table} REFERENCING OLD TABLE AS old_rows',
+}
+
+
+def upgrade() -> None:
+    op.execute('CREATE SEQUENCE change_version_seq')
+    op.create_table('change_versions',
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('scope')
+    )
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_change_versions() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            parent_column text := TG_ARGV[0];
+            changed text;
+        BEGIN
+            IF parent_column IS NULL THEN
+                INSERT INTO change_versions (scope, version) VALUES (TG_TABLE_NAME, nextval('change_version_seq'))
+                ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+                RETURN NULL;
+            END IF;
+
+            IF TG_OP = 'INSERT' THEN
+                changed := format('SELECT %I AS parent FROM new_rows', parent_column);
+            ELSIF TG_OP = 'DELETE' THEN
+                changed := format('SELECT %I AS parent FROM old_rows', parent_column);
+            ELSE
+                changed := format('SELECT %I AS parent FROM old_rows UNION ALL SELECT %I FROM new_rows', parent_column, parent_column);
+            END IF;
+            EXECUTE format(
+                'INSERT INTO change_versions (scope, version) '
+                'SELECT scope, nextval(''change_version_seq'') FROM ('
+                '    SELECT DISTINCT %L || '':'' || parent AS scope FROM (%s) changed WHERE parent IS NOT NULL'
+                ') scopes ORDER BY scope '
+                'ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version',
+                TG_TABLE_NAME, changed
+            );
+            RETURN NULL;
+        END
+        $$
+    """)
+    for table, parent_column in VERSIONED_TABLES.items():
+        argument = f"'{parent_column}'" if parent_column else ''
+        for event, clause in TRIGGER_EVENTS.items():
+            op.execute(
+                f'CREATE TRIGGER {table}_bump_versions_{event} AFTER {clause.format(table=table)} '
+                f'FOR EACH STATEMENT EXECUTE FUNCTION bump_change_versions({argument})'
+            )
+
+
+def downgrade() -> None:
+    for table in VERSIONED_TABLES:
+        for event in TRIGGER_EVENTS:
+            op.execute(f'DROP TRIGGER {table}_bump_versions_{event} ON {table}')
+    op.execute('DROP FUNCTION bump_change_versions()')
+    op.drop_table('change_versions')
+    op.execute('DROP SEQUENCE change_version_seq')
@@ -0,0 +1,79 @@
+"""added rollup tables
+
+Revision ID: 7c41d2a9e5b8
+Revises: c8f1a4e27d05
+Create Date: 2026-10-18 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c41d2a9e5b8'
+down_revision: Union[str, None] = 'c8f1a4e27d05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _rollup_columns():
+    return [
+        sa.Column('footprint_total', sa.Float(), nullable=False),
+        sa.Column('footprint_count', sa.Integer(), nullable=False),
+        sa.Column('seq_total', sa.Float(), nullable=False),
+        sa.Column('seq_count', sa.Integer(), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table('source_rollups',
+    sa.Column('source_id', sa.Integer(), nullable=False),
+    *_rollup_columns(),
+    sa.ForeignKeyConstraint(['source_id'], ['carbon_emissions_sources.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('source_id')
+    )
+    op.create_table('branch_rollups',
+    sa.Column('branch_id', sa.Integer(), nullable=False),
+    *_rollup_columns(),
+    sa.ForeignKeyConstraint(['branch_id'], ['company_branches.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('branch_id')
+    )
+    op.create_table('company_rollups',
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    *_rollup_columns(),
+    sa.ForeignKeyConstraint(['company_id'], ['companies.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('company_id')
+    )
+
+    # Backfill from the existing fact tables; `python -m models.rollups rebuild` does the same later on
+    op.execute("""
+        INSERT INTO source_rollups (source_id, footprint_total, footprint_count, seq_total, seq_count)
+        SELECT s.id, COALESCE(f.total, 0), COALESCE(f.count, 0), COALESCE(q.total, 0), COALESCE(q.count, 0)
+        FROM carbon_emissions_sources s
+        LEFT JOIN (SELECT source_id, SUM(footprint_value) AS total, COUNT(*) AS count
+                   FROM carbon_footprints GROUP BY source_id) f ON f.source_id = s.id
+        LEFT JOIN (SELECT source_id, SUM(seq_value) AS total, COUNT(*) AS count
+                   FROM carbon_sequestration GROUP BY source_id) q ON q.source_id = s.id
+    """)
+    op.execute("""
+        INSERT INTO branch_rollups (branch_id, footprint_total, footprint_count, seq_total, seq_count)
+        SELECT s.branch_id, SUM(r.footprint_total), SUM(r.footprint_count), SUM(r.seq_total), SUM(r.seq_count)
+        FROM source_rollups r JOIN carbon_emissions_sources s ON s.id = r.source_id
+        WHERE s.branch_id IS NOT NULL
+        GROUP BY s.branch_id
+    """)
+    op.execute("""
+        INSERT INTO company_rollups (company_id, footprint_total, footprint_count, seq_total, seq_count)
+        SELECT b.company_id, SUM(r.footprint_total), SUM(r.footprint_count), SUM(r.seq_total), SUM(r.seq_count)
+        FROM branch_rollups r JOIN company_branches b ON b.id = r.branch_id
+        WHERE b.company_id IS NOT NULL
+        GROUP BY b.company_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('company_rollups')
+    op.drop_table('branch_rollups')
+    op.drop_table('source_rollups')
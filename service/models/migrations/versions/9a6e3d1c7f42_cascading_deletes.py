@@ -0,0 +1,47 @@
+"""cascading deletes
+
+Recreates the foreign keys of the company hierarchy with ON DELETE CASCADE, so deleting
+a company, branch or emission source is one statement and the database removes the rows
+below it, instead of the ORM loading and deleting them one by one.
+
+Revision ID: 9a6e3d1c7f42
+Revises: 4d2c8a61f9b3
+Create Date: 2026-10-18 16:48:52.310467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a6e3d1c7f42'
+down_revision: Union[str, None] = '4d2c8a61f9b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, referenced table); every one is indexed on its column, so cascades never scan
+FOREIGN_KEYS = [
+    ('carbon_offsets', 'company_id', 'companies'),
+    ('company_branches', 'company_id', 'companies'),
+    ('carbon_emissions_sources', 'branch_id', 'company_branches'),
+    ('carbon_footprints', 'source_id', 'carbon_emissions_sources'),
+    ('carbon_sequestration', 'source_id', 'carbon_emissions_sources'),
+]
+
+
+def _recreate_foreign_keys(ondelete) -> None:
+    for table, column, referenced in FOREIGN_KEYS:
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referenced, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    _recreate_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    _recreate_foreign_keys(None)
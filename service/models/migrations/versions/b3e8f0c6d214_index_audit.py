@@ -0,0 +1,69 @@
+"""index audit
+
+Drops indexes on columns that are never filtered on (primary keys are already indexed)
+and adds the foreign key and covering indexes the queries actually use. Indexes are
+built and dropped CONCURRENTLY so ingestion keeps running during the migration.
+
+Revision ID: b3e8f0c6d214
+Revises: 7c41d2a9e5b8
+Create Date: 2026-10-18 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e8f0c6d214'
+down_revision: Union[str, None] = '7c41d2a9e5b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+UNUSED_INDEXES = {
+    'companies': ['id'],
+    'carbon_offsets': ['id', 'offset_type', 'offset_amount', 'date'],
+    'company_branches': ['id', 'branch_name'],
+    'carbon_emissions_sources': ['id', 'source_type', 'total_emission_value'],
+    'carbon_regulations': ['id', 'description'],
+    'carbon_footprints': ['id', 'footprint_value'],
+    'carbon_sequestration': ['id', 'seq_value'],
+}
+
+FOREIGN_KEY_INDEXES = {
+    'carbon_offsets': 'company_id',
+    'company_branches': 'company_id',
+    'carbon_emissions_sources': 'branch_id',
+}
+
+COVERING_INDEXES = {
+    'carbon_footprints': 'footprint_value',
+    'carbon_sequestration': 'seq_value',
+}
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, column in FOREIGN_KEY_INDEXES.items():
+            op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False, postgresql_concurrently=True)
+        for table, value_column in COVERING_INDEXES.items():
+            op.create_index(
+                f'ix_{table}_source_id_id', table, ['source_id', 'id'], unique=False,
+                postgresql_include=[value_column], postgresql_concurrently=True,
+            )
+        for table, columns in UNUSED_INDEXES.items():
+            for column in columns:
+                op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_{column}')
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table, columns in UNUSED_INDEXES.items():
+            for column in columns:
+                op.create_index(op.f(f'ix_{table}_{column}'), table, [column], unique=False, postgresql_concurrently=True)
+        for table in COVERING_INDEXES:
+            op.drop_index(f'ix_{table}_source_id_id', table_name=table, postgresql_concurrently=True)
+        for table, column in FOREIGN_KEY_INDEXES.items():
+            op.drop_index(op.f(f'ix_{table}_{column}'), table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""create missing sequestration table
+
+carbon_sequestration was only ever created by metadata.create_all; 0a77ae6743b3 is named
+after it but is empty. Creates the table when it is missing, so databases built by the
+migrations alone (fresh ones, or ones already at 2e7bd706f707) get it before the rollup
+backfill reads it. Databases built by create_all already have it and are left unchanged.
+
+Revision ID: c8f1a4e27d05
+Revises: 2e7bd706f707
+Create Date: 2026-10-18 19:04:17.529316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f1a4e27d05'
+down_revision: Union[str, None] = '2e7bd706f707'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('carbon_sequestration'):
+        return
+    op.create_table('carbon_sequestration',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('source_id', sa.Integer(), nullable=True),
+    sa.Column('seq_value', sa.Float(), nullable=True),
+    sa.ForeignKeyConstraint(['source_id'], ['carbon_emissions_sources.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_carbon_sequestration_id'), 'carbon_sequestration', ['id'], unique=False)
+    op.create_index(op.f('ix_carbon_sequestration_seq_value'), 'carbon_sequestration', ['seq_value'], unique=False)
+
+
+def downgrade() -> None:
+    # Whether upgrade() created the table is not recorded, and create_all databases had it before
+    # this revision, so the table is kept
+    pass
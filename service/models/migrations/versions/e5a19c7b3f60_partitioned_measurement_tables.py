@@ -0,0 +1,101 @@
+"""partitioned measurement tables
+
+Adds a measured_at timestamp to carbon_footprints and carbon_sequestration and rebuilds
+both as tables range-partitioned by quarter on it, with a default partition and a BRIN
+index on measured_at. Existing rows have no measurement time, so they are stamped with
+the time of the migration.
+
+Revision ID: e5a19c7b3f60
+Revises: b3e8f0c6d214
+Create Date: 2026-10-18 13:40:05.118270
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a19c7b3f60'
+down_revision: Union[str, None] = 'b3e8f0c6d214'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# table -> value column
+TABLES = {
+    'carbon_footprints': 'footprint_value',
+    'carbon_sequestration': 'seq_value',
+}
+
+# quarterly partitions created up front, starting with the current quarter
+QUARTERS_AHEAD = 4
+
+
+def _quarters():
+    today = datetime.date.today()
+    start = datetime.date(today.year, 3 * ((today.month - 1) // 3) + 1, 1)
+    for _ in range(QUARTERS_AHEAD + 1):
+        end = datetime.date(start.year + 1, 1, 1) if start.month == 10 else datetime.date(start.year, start.month + 3, 1)
+        yield start, end
+        start = end
+
+
+def upgrade() -> None:
+    for table, value_column in TABLES.items():
+        op.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+        op.execute(f'ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_pkey TO {table}_legacy_pkey')
+        op.execute(f'ALTER TABLE {table}_legacy RENAME CONSTRAINT {table}_source_id_fkey TO {table}_legacy_source_id_fkey')
+        op.execute(f'DROP INDEX IF EXISTS ix_{table}_source_id_id')
+
+        op.execute(f"""
+            CREATE TABLE {table} (
+                id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'),
+                source_id INTEGER REFERENCES carbon_emissions_sources (id),
+                {value_column} DOUBLE PRECISION,
+                measured_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+                PRIMARY KEY (id, measured_at)
+            ) PARTITION BY RANGE (measured_at)
+        """)
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        for start, end in _quarters():
+            name = f'{table}_{start.year}q{(start.month - 1) // 3 + 1}'
+            op.execute(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')")
+
+        op.execute(f"""
+            INSERT INTO {table} (id, source_id, {value_column}, measured_at)
+            SELECT id, source_id, {value_column}, now() FROM {table}_legacy
+        """)
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.execute(f'DROP TABLE {table}_legacy')
+
+        op.create_index(f'ix_{table}_source_id_id', table, ['source_id', 'id'], unique=False, postgresql_include=[value_column])
+        op.create_index(f'ix_{table}_measured_at', table, ['measured_at'], unique=False, postgresql_using='brin')
+
+
+def downgrade() -> None:
+    for table, value_column in TABLES.items():
+        op.execute(f'ALTER TABLE {table} RENAME TO {table}_partitioned')
+        op.execute(f'ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey')
+        op.execute(f'ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_source_id_fkey TO {table}_partitioned_source_id_fkey')
+        op.execute(f'DROP INDEX ix_{table}_source_id_id')
+        op.execute(f'DROP INDEX ix_{table}_measured_at')
+
+        op.execute(f"""
+            CREATE TABLE {table} (
+                id INTEGER NOT NULL DEFAULT nextval('{table}_id_seq'),
+                source_id INTEGER REFERENCES carbon_emissions_sources (id),
+                {value_column} DOUBLE PRECISION,
+                PRIMARY KEY (id)
+            )
+        """)
+        op.execute(f"""
+            INSERT INTO {table} (id, source_id, {value_column})
+            SELECT id, source_id, {value_column} FROM {table}_partitioned
+        """)
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        op.execute(f'DROP TABLE {table}_partitioned')
+
+        op.create_index(f'ix_{table}_source_id_id', table, ['source_id', 'id'], unique=False, postgresql_include=[value_column])
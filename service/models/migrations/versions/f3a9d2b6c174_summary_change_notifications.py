@@ -0,0 +1,57 @@
+"""summary change notifications
+
+Adds statement-level triggers that NOTIFY the summary_changes channel on every write to the
+tables the summaries are computed from. Notifications are delivered on commit to every
+worker listening, which clears its summary cache.
+
+Revision ID: f3a9d2b6c174
+Revises: 9a6e3d1c7f42
+Create Date: 2026-10-18 19:41:08.613052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a9d2b6c174'
+down_revision: Union[str, None] = '9a6e3d1c7f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SUMMARY_TABLES = [
+    'companies',
+    'company_branches',
+    'carbon_offsets',
+    'carbon_emissions_sources',
+    'carbon_footprints',
+    'carbon_sequestration',
+    'source_rollups',
+    'branch_rollups',
+    'company_rollups',
+]
+
+
+def upgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_summary_change() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM pg_notify('summary_changes', TG_TABLE_NAME);
+            RETURN NULL;
+        END
+        $$
+    """)
+    for table in SUMMARY_TABLES:
+        op.execute(
+            f'CREATE TRIGGER {table}_notify_summary_change AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} '
+            'FOR EACH STATEMENT EXECUTE FUNCTION notify_summary_change()'
+        )
+
+
+def downgrade() -> None:
+    for table in SUMMARY_TABLES:
+        op.execute(f'DROP TRIGGER {table}_notify_summary_change ON {table}')
+    op.execute('DROP FUNCTION notify_summary_change()')
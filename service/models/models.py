@@ -1,5 +1,5 @@
-from sqlalchemy.types import Integer, String, Date, Enum, Float
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy.types import BigInteger, Integer, String, Date, DateTime, Enum, Float
+from sqlalchemy import DDL, Column, ForeignKey, Index, Sequence, event, func
 import enum
 from sqlalchemy.orm import relationship
 
@@ -9,11 +9,12 @@ from models.database import Base
 class Company(Base):
     __tablename__ = "companies"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     c_name = Column(String, index=True)
 
-    carbon_offsets = relationship("CarbonOffset", back_populates="company", cascade="all, delete-orphan")
-    branches = relationship("CompanyBranch", back_populates="company", cascade="all, delete-orphan")
+    # Children are deleted by their ON DELETE CASCADE foreign keys, without loading them
+    carbon_offsets = relationship("CarbonOffset", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
+    branches = relationship("CompanyBranch", back_populates="company", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class OffsetType(enum.Enum):
@@ -24,11 +25,11 @@ class OffsetType(enum.Enum):
 class CarbonOffset(Base):
     __tablename__ = "carbon_offsets"
 
-    id = Column(Integer, primary_key=True, index=True)
-    company_id = Column(Integer, ForeignKey("companies.id"))
-    offset_type = Column(Enum(OffsetType), index=True)
-    offset_amount = Column(Integer, index=True)
-    date = Column(Date, index=True)
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), index=True)
+    offset_type = Column(Enum(OffsetType))
+    offset_amount = Column(Integer)
+    date = Column(Date)
 
     company = relationship("Company", back_populates="carbon_offsets")
 
@@ -36,49 +37,112 @@ class CarbonOffset(Base):
 class CompanyBranch(Base):
     __tablename__ = "company_branches"
 
-    id = Column(Integer, primary_key=True, index=True)
-    company_id = Column(Integer, ForeignKey("companies.id"))
-    branch_name = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), index=True)
+    branch_name = Column(String)
 
     company = relationship("Company", back_populates="branches")
-    emission_sources = relationship("CarbonEmissionsSource", back_populates="branch", cascade="all, delete-orphan")
+    emission_sources = relationship("CarbonEmissionsSource", back_populates="branch", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class CarbonEmissionsSource(Base):
     __tablename__ = "carbon_emissions_sources"
 
-    id = Column(Integer, primary_key=True, index=True)
-    branch_id = Column(Integer, ForeignKey("company_branches.id"))
-    source_type = Column(String, index=True)
-    total_emission_value = Column(Float, index=True)
+    id = Column(Integer, primary_key=True)
+    branch_id = Column(Integer, ForeignKey("company_branches.id", ondelete="CASCADE"), index=True)
+    source_type = Column(String)
+    total_emission_value = Column(Float)
     
     branch = relationship("CompanyBranch", back_populates="emission_sources")
-    footprints = relationship("CarbonFootprint", back_populates="source", cascade="all, delete-orphan")
-    sequestrations = relationship("CarbonSequestration", back_populates="source", cascade="all, delete-orphan")
+    footprints = relationship("CarbonFootprint", back_populates="source", cascade="all, delete-orphan", passive_deletes=True)
+    sequestrations = relationship("CarbonSequestration", back_populates="source", cascade="all, delete-orphan", passive_deletes=True)
     
 
 class CarbonRegulation(Base):
     __tablename__ = "carbon_regulations"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     regulation_name = Column(String, index=True)
-    description = Column(String, index=True)
+    description = Column(String)
 
 
 class CarbonFootprint(Base): 
     __tablename__ = "carbon_footprints"
+    __table_args__ = (
+        # Serves per-source listing in id order and per-source sums with index-only scans
+        Index("ix_carbon_footprints_source_id_id", "source_id", "id", postgresql_include=["footprint_value"]),
+        Index("ix_carbon_footprints_measured_at", "measured_at", postgresql_using="brin"),
+        # Quarterly partitions are managed with `python -m models.partitions`
+        {"postgresql_partition_by": "RANGE (measured_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    source_id = Column(Integer, ForeignKey("carbon_emissions_sources.id"))
-    footprint_value = Column(Float, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(Integer, ForeignKey("carbon_emissions_sources.id", ondelete="CASCADE"))
+    footprint_value = Column(Float)
+    measured_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     source = relationship("CarbonEmissionsSource", back_populates="footprints")
 
 class CarbonSequestration(Base): 
     __tablename__ = "carbon_sequestration"
+    __table_args__ = (
+        # Serves per-source listing in id order and per-source sums with index-only scans
+        Index("ix_carbon_sequestration_source_id_id", "source_id", "id", postgresql_include=["seq_value"]),
+        Index("ix_carbon_sequestration_measured_at", "measured_at", postgresql_using="brin"),
+        # Quarterly partitions are managed with `python -m models.partitions`
+        {"postgresql_partition_by": "RANGE (measured_at)"},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    source_id = Column(Integer, ForeignKey("carbon_emissions_sources.id"))
-    seq_value = Column(Float, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    source_id = Column(Integer, ForeignKey("carbon_emissions_sources.id", ondelete="CASCADE"))
+    seq_value = Column(Float)
+    measured_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     
     source = relationship("CarbonEmissionsSource", back_populates="sequestrations")
+
+
+# A partitioned table accepts no rows until it has a partition; the default one catches
+# rows outside every quarterly partition
+for _table in (CarbonFootprint.__table__, CarbonSequestration.__table__):
+    event.listen(_table, "after_create", DDL(f"CREATE TABLE {_table.name}_default PARTITION OF {_table.name} DEFAULT"))
+
+
+class SourceRollup(Base):
+    __tablename__ = "source_rollups"
+
+    source_id = Column(Integer, ForeignKey("carbon_emissions_sources.id", ondelete="CASCADE"), primary_key=True)
+    footprint_total = Column(Float, nullable=False, default=0.0)
+    footprint_count = Column(Integer, nullable=False, default=0)
+    seq_total = Column(Float, nullable=False, default=0.0)
+    seq_count = Column(Integer, nullable=False, default=0)
+
+
+class BranchRollup(Base):
+    __tablename__ = "branch_rollups"
+
+    branch_id = Column(Integer, ForeignKey("company_branches.id", ondelete="CASCADE"), primary_key=True)
+    footprint_total = Column(Float, nullable=False, default=0.0)
+    footprint_count = Column(Integer, nullable=False, default=0)
+    seq_total = Column(Float, nullable=False, default=0.0)
+    seq_count = Column(Integer, nullable=False, default=0)
+
+
+class CompanyRollup(Base):
+    __tablename__ = "company_rollups"
+
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), primary_key=True)
+    footprint_total = Column(Float, nullable=False, default=0.0)
+    footprint_count = Column(Integer, nullable=False, default=0)
+    seq_total = Column(Float, nullable=False, default=0.0)
+    seq_count = Column(Integer, nullable=False, default=0)
+
+
+# Versions of resources for ETags, bumped by the triggers installed in models.versions
+change_version_seq = Sequence("change_version_seq", metadata=Base.metadata)
+
+
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+
+    scope = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False)
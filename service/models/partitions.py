@@ -0,0 +1,189 @@
+import argparse
+import datetime
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from models import rollups, versions
+
+# Fact tables stored as quarterly range partitions on measured_at
+PARTITIONED_TABLES = ["carbon_footprints", "carbon_sequestration"]
+
+# Value column and rollup total and count keys of each partitioned table
+PARTITION_ROLLUPS = {
+    "carbon_footprints": ("footprint_value", "footprint_total", "footprint_count"),
+    "carbon_sequestration": ("seq_value", "seq_total", "seq_count"),
+}
+
+
+def quarter_start(day: datetime.date) -> datetime.date:
+    """
+    Get the first day of the quarter containing a date.
+    """
+    return datetime.date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+
+def next_quarter(start: datetime.date) -> datetime.date:
+    """
+    Get the first day of the quarter after the one starting on ``start``.
+    """
+    if start.month == 10:
+        return datetime.date(start.year + 1, 1, 1)
+    return datetime.date(start.year, start.month + 3, 1)
+
+
+def partition_name(table: str, start: datetime.date) -> str:
+    """
+    Get the name of a table's partition for the quarter starting on ``start``, e.g. carbon_footprints_2026q4.
+    """
+    return f"{table}_{start.year}q{(start.month - 1) // 3 + 1}"
+
+
+def _check_table(table: str):
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not a partitioned table")
+
+
+def create_partition(db: Session, table: str, start: datetime.date):
+    """
+    Create a table's partition for one quarter, if it does not exist yet.
+
+    Rows of that quarter that landed in the default partition are moved into the new
+    partition in the same transaction.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        table (str): Name of the partitioned table.
+        start (datetime.date): First day of the quarter.
+
+    Returns:
+        bool: Whether the partition was created.
+    """
+    _check_table(table)
+    start = quarter_start(start)
+    end = next_quarter(start)
+    name = partition_name(table, start)
+    if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+        return False
+
+    bounds = {"start": start, "end": end}
+    db.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE measured_at >= :start AND measured_at < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    # Lets ATTACH skip its validation scan of the new partition
+    db.execute(text(
+        f"ALTER TABLE {name} ADD CONSTRAINT {name}_bounds CHECK (measured_at >= '{start}' AND measured_at < '{end}')"
+    ))
+    db.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    db.execute(text(f"ALTER TABLE {name} DROP CONSTRAINT {name}_bounds"))
+    db.commit()
+    return True
+
+
+def ensure_partitions(db: Session, ahead: int = 4, today: datetime.date = None):
+    """
+    Create the partitions of every partitioned table from the current quarter up to ``ahead`` quarters ahead.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        ahead (int): Number of future quarters to create.
+        today (datetime.date): Date to count from, defaults to today.
+
+    Returns:
+        list: Names of the partitions that were created.
+    """
+    created = []
+    for table in PARTITIONED_TABLES:
+        start = quarter_start(today or datetime.date.today())
+        for _ in range(ahead + 1):
+            if create_partition(db, table, start):
+                created.append(partition_name(table, start))
+            start = next_quarter(start)
+    return created
+
+
+def detach_partition(db: Session, table: str, start: datetime.date):
+    """
+    Detach a table's partition for one quarter, keeping it as a standalone table.
+
+    The partition's rows drop out of every query and can be archived or dropped at leisure. In
+    the same transaction their totals are subtracted from the rollups and the versions of their
+    sources are bumped, so summaries and ETags stop counting them. Writes to the table wait
+    until the detach commits.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        table (str): Name of the partitioned table.
+        start (datetime.date): First day of the quarter.
+
+    Returns:
+        str: Name of the detached table.
+    """
+    _check_table(table)
+    name = partition_name(table, quarter_start(start))
+    value_column, total_key, count_key = PARTITION_ROLLUPS[table]
+    # Blocks writers, not readers, so the totals cannot change before the partition is gone
+    db.execute(text(f"LOCK TABLE {table}, {name} IN SHARE ROW EXCLUSIVE MODE"))
+    totals = db.execute(text(
+        f"SELECT source_id, COALESCE(SUM({value_column}), 0) AS total, COUNT(*) AS count "
+        f"FROM {name} WHERE source_id IS NOT NULL GROUP BY source_id"
+    )).all()
+    rollups.apply_deltas(db, {source_id: {total_key: -total, count_key: -count} for source_id, total, count in totals})
+    versions.bump_versions(db, [versions.scope(table, source_id) for source_id, _, _ in totals])
+    db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    db.commit()
+    return name
+
+
+def list_partitions(db: Session, table: str):
+    """
+    List a table's partitions with their bounds and estimated row counts.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        table (str): Name of the partitioned table.
+
+    Returns:
+        list: One dict per partition.
+    """
+    _check_table(table)
+    rows = db.execute(text(
+        "SELECT c.relname AS name, pg_get_expr(c.relpartbound, c.oid) AS bounds, c.reltuples::bigint AS estimated_rows "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) ORDER BY c.relname"
+    ), {"table": table})
+    return [dict(row._mapping) for row in rows]
+
+
+if __name__ == '__main__':
+    from models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Manage the quarterly partitions of the footprint and sequestration tables.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = subparsers.add_parser("create", help="Create partitions from the current quarter onwards")
+    create_parser.add_argument('--ahead', type=int, default=4, help='Number of future quarters to create')
+
+    detach_parser = subparsers.add_parser("detach", help="Detach one quarter's partition")
+    detach_parser.add_argument('table', choices=PARTITIONED_TABLES)
+    detach_parser.add_argument('quarter', type=datetime.date.fromisoformat, help='Any date within the quarter, e.g. 2024-01-01')
+
+    list_parser = subparsers.add_parser("list", help="List partitions")
+
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "create":
+            for name in ensure_partitions(db, args.ahead):
+                print(f"Created {name}")
+        elif args.command == "detach":
+            print(f"Detached {detach_partition(db, args.table, args.quarter)}")
+        else:
+            for table in PARTITIONED_TABLES:
+                for partition in list_partitions(db, table):
+                    print(f"{partition['name']:<32} {partition['estimated_rows']:>12} {partition['bounds']}")
+    finally:
+        db.close()
@@ -0,0 +1,354 @@
+import argparse
+import sys
+
+from sqlalchemy import Float, Integer, bindparam, column, delete, func as F, insert, or_, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import models
+
+ROLLUP_COLUMNS = ["footprint_total", "footprint_count", "seq_total", "seq_count"]
+DELTA_COLUMNS = {"footprint_total": Float, "footprint_count": Integer, "seq_total": Float, "seq_count": Integer}
+
+# Running float sums drift from a fresh SUM() by rounding error only
+FLOAT_TOLERANCE = 1e-6
+
+
+def _upsert_totals(rollup, key: str, key_column, changes, joins):
+    """
+    Build an upsert adding the summed changes of each key to its rollup row.
+
+    Args:
+        rollup: Rollup model to update.
+        key (str): Name of the rollup's primary key column.
+        key_column: Column the changes are grouped by into rollup keys.
+        changes: FROM clause holding the per-source changes.
+        joins: FROM clause joining the changes to ``key_column``.
+
+    Returns:
+        Insert: The INSERT ... ON CONFLICT DO UPDATE statement.
+    """
+    totals = (
+        select(key_column, *[F.sum(changes.c[column]) for column in ROLLUP_COLUMNS])
+        .select_from(joins)
+        .where(key_column.isnot(None))
+        .group_by(key_column)
+        # Lock rollup rows in key order so concurrent writers cannot deadlock
+        .order_by(key_column)
+    )
+    stmt = pg_insert(rollup).from_select([key] + ROLLUP_COLUMNS, totals)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={column: getattr(rollup, column) + getattr(stmt.excluded, column) for column in ROLLUP_COLUMNS},
+    )
+
+
+def apply_deltas(db: Session, deltas: dict):
+    """
+    Add changes in sources' footprints or sequestrations to the source, branch and company rollups.
+
+    The rollups are updated in the caller's transaction, so they commit or roll back together
+    with the changes themselves. Three statements are issued however many sources changed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        deltas (dict): Changes by emission source ID, each a dict with any of the keys
+            footprint_total, footprint_count, seq_total and seq_count.
+    """
+    if not deltas:
+        return
+    rows = sorted(deltas.items())
+    # One array per column rather than a VALUES row per source, so the statement is the same for
+    # any number of sources and compiles once
+    changes = F.unnest(
+        bindparam("delta_source_ids", [source_id for source_id, _ in rows], type_=ARRAY(Integer)),
+        *[
+            bindparam(
+                f"delta_{name}",
+                [float(delta.get(name, 0.0)) if column_type is Float else delta.get(name, 0) for _, delta in rows],
+                type_=ARRAY(column_type),
+            )
+            for name, column_type in DELTA_COLUMNS.items()
+        ],
+    ).table_valued(
+        column("source_id", Integer), *[column(name, column_type) for name, column_type in DELTA_COLUMNS.items()],
+    ).render_derived(name="changes")
+    source = models.CarbonEmissionsSource
+    with_sources = changes.join(source, source.id == changes.c.source_id)
+    with_branches = with_sources.join(models.CompanyBranch, models.CompanyBranch.id == source.branch_id)
+
+    db.execute(_upsert_totals(models.SourceRollup, "source_id", source.id, changes, with_sources))
+    db.execute(_upsert_totals(models.BranchRollup, "branch_id", source.branch_id, changes, with_sources))
+    db.execute(_upsert_totals(models.CompanyRollup, "company_id", models.CompanyBranch.company_id, changes, with_branches))
+
+
+def apply_delta(db: Session, source_id: int, footprint_total: float = 0.0, footprint_count: int = 0, seq_total: float = 0.0, seq_count: int = 0):
+    """
+    Add a change in one source's footprints or sequestrations to the source, branch and company rollups.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        source_id (int): ID of the emission source that changed.
+        footprint_total (float): Change in the source's footprint total.
+        footprint_count (int): Change in the source's number of footprints.
+        seq_total (float): Change in the source's sequestration total.
+        seq_count (int): Change in the source's number of sequestrations.
+    """
+    apply_deltas(db, {source_id: {
+        "footprint_total": footprint_total,
+        "footprint_count": footprint_count,
+        "seq_total": seq_total,
+        "seq_count": seq_count,
+    }})
+
+
+def _subtract_rollups(db: Session, parent, parent_key, child, child_ids: list, joins):
+    """
+    Subtract children's rollup rows from the rollup rows of their parents, with one grouped UPDATE.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        parent: Rollup model of the parent level.
+        parent_key: Column the children are grouped by into parent keys.
+        child: Rollup model of the child level.
+        child_ids (list): IDs of the children being removed.
+        joins: FROM clause joining the child rollups to ``parent_key``.
+    """
+    parent_column = parent.__table__.primary_key.columns.values()[0]
+    child_column = child.__table__.primary_key.columns.values()[0]
+    removed = (
+        select(parent_key.label("key"), *[F.sum(getattr(child, column)).label(column) for column in ROLLUP_COLUMNS])
+        .select_from(joins)
+        .where(child_column.in_(child_ids), parent_key.isnot(None))
+        .group_by(parent_key)
+        .subquery()
+    )
+    # Lock parent rollup rows in key order, as apply_deltas does, so concurrent writers cannot deadlock
+    db.execute(select(parent_column).where(parent_column.in_(select(removed.c.key))).order_by(parent_column).with_for_update())
+    db.execute(
+        update(parent)
+        .where(parent_column == removed.c.key)
+        .values({column: getattr(parent, column) - removed.c[column] for column in ROLLUP_COLUMNS})
+    )
+
+
+def remove_sources(db: Session, source_ids: list):
+    """
+    Take sources that are about to be deleted out of their branch and company rollups.
+
+    The sources' own rollup rows are removed by their ON DELETE CASCADE foreign key. Two
+    statements are issued per level however many sources are removed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        source_ids (list): IDs of the emission sources being deleted.
+    """
+    if not source_ids:
+        return
+    source = models.CarbonEmissionsSource
+    with_sources = models.SourceRollup.__table__.join(source, source.id == models.SourceRollup.source_id)
+    with_branches = with_sources.join(models.CompanyBranch, models.CompanyBranch.id == source.branch_id)
+    _subtract_rollups(db, models.BranchRollup, source.branch_id, models.SourceRollup, source_ids, with_sources)
+    _subtract_rollups(db, models.CompanyRollup, models.CompanyBranch.company_id, models.SourceRollup, source_ids, with_branches)
+
+
+def remove_source(db: Session, source_id: int):
+    """
+    Take a source that is about to be deleted out of its branch and company rollups.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        source_id (int): ID of the emission source being deleted.
+    """
+    remove_sources(db, [source_id])
+
+
+def remove_branches(db: Session, branch_ids: list):
+    """
+    Take branches that are about to be deleted out of their company rollups.
+
+    The rollup rows of the branches and their sources are removed by their ON DELETE CASCADE
+    foreign keys. Two statements are issued however many branches are removed.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        branch_ids (list): IDs of the branches being deleted.
+    """
+    if not branch_ids:
+        return
+    branch = models.CompanyBranch
+    with_branches = models.BranchRollup.__table__.join(branch, branch.id == models.BranchRollup.branch_id)
+    _subtract_rollups(db, models.CompanyRollup, branch.company_id, models.BranchRollup, branch_ids, with_branches)
+
+
+def remove_branch(db: Session, branch_id: int):
+    """
+    Take a branch that is about to be deleted out of its company rollup.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        branch_id (int): ID of the branch being deleted.
+    """
+    remove_branches(db, [branch_id])
+
+
+def fresh_source_totals():
+    """
+    Get the SELECT recomputing every source's rollup columns from the fact tables.
+    """
+    footprints = (
+        select(
+            models.CarbonFootprint.source_id,
+            F.sum(models.CarbonFootprint.footprint_value).label("total"),
+            F.count().label("count"),
+        )
+        .group_by(models.CarbonFootprint.source_id)
+        .subquery()
+    )
+    sequestrations = (
+        select(
+            models.CarbonSequestration.source_id,
+            F.sum(models.CarbonSequestration.seq_value).label("total"),
+            F.count().label("count"),
+        )
+        .group_by(models.CarbonSequestration.source_id)
+        .subquery()
+    )
+    return (
+        select(
+            models.CarbonEmissionsSource.id.label("source_id"),
+            F.coalesce(footprints.c.total, 0.0).label("footprint_total"),
+            F.coalesce(footprints.c.count, 0).label("footprint_count"),
+            F.coalesce(sequestrations.c.total, 0.0).label("seq_total"),
+            F.coalesce(sequestrations.c.count, 0).label("seq_count"),
+        )
+        .select_from(models.CarbonEmissionsSource)
+        .outerjoin(footprints, footprints.c.source_id == models.CarbonEmissionsSource.id)
+        .outerjoin(sequestrations, sequestrations.c.source_id == models.CarbonEmissionsSource.id)
+    )
+
+
+def _group_totals(totals, key_column, key: str, onclause):
+    """
+    Sum a totals SELECT into its parent level.
+    """
+    totals = totals.subquery()
+    return (
+        select(key_column.label(key), *[F.sum(totals.c[column]).label(column) for column in ROLLUP_COLUMNS])
+        .select_from(totals)
+        .join(key_column.table, onclause(totals))
+        .where(key_column.isnot(None))
+        .group_by(key_column)
+    )
+
+
+def fresh_branch_totals():
+    """
+    Get the SELECT recomputing every branch's rollup columns from the fact tables.
+    """
+    return _group_totals(
+        fresh_source_totals(),
+        models.CarbonEmissionsSource.branch_id,
+        "branch_id",
+        lambda totals: totals.c.source_id == models.CarbonEmissionsSource.id,
+    )
+
+
+def fresh_company_totals():
+    """
+    Get the SELECT recomputing every company's rollup columns from the fact tables.
+    """
+    return _group_totals(
+        fresh_branch_totals(),
+        models.CompanyBranch.company_id,
+        "company_id",
+        lambda totals: totals.c.branch_id == models.CompanyBranch.id,
+    )
+
+
+ROLLUPS = [
+    (models.SourceRollup, "source_id", fresh_source_totals),
+    (models.BranchRollup, "branch_id", fresh_branch_totals),
+    (models.CompanyRollup, "company_id", fresh_company_totals),
+]
+
+
+def _lock_rollups(db: Session):
+    # Blocks writers until commit, so no delta lands between the recount and the swap
+    db.execute(text(
+        "LOCK TABLE source_rollups, branch_rollups, company_rollups IN SHARE ROW EXCLUSIVE MODE"
+    ))
+
+
+def rebuild(db: Session):
+    """
+    Recompute every rollup row from the fact tables.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+    """
+    _lock_rollups(db)
+    for rollup, key, fresh_totals in ROLLUPS:
+        db.execute(delete(rollup))
+        db.execute(insert(rollup).from_select([key] + ROLLUP_COLUMNS, fresh_totals()))
+    db.commit()
+
+
+def verify(db: Session):
+    """
+    Compare every rollup row with a fresh recount of the fact tables.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+
+    Returns:
+        dict: Rows that drifted, by rollup table name. Each row holds the key, the stored
+        values and the recounted values.
+    """
+    drift = {}
+    for rollup, key, fresh_totals in ROLLUPS:
+        fresh = fresh_totals().subquery()
+        stored_key = getattr(rollup, key)
+        mismatches = [
+            F.abs(F.coalesce(getattr(rollup, column), 0) - F.coalesce(fresh.c[column], 0)) > FLOAT_TOLERANCE
+            if column.endswith("_total")
+            else F.coalesce(getattr(rollup, column), 0) != F.coalesce(fresh.c[column], 0)
+            for column in ROLLUP_COLUMNS
+        ]
+        rows = db.execute(
+            select(
+                F.coalesce(stored_key, fresh.c[key]).label(key),
+                *[getattr(rollup, column).label(f"stored_{column}") for column in ROLLUP_COLUMNS],
+                *[fresh.c[column].label(f"fresh_{column}") for column in ROLLUP_COLUMNS],
+            )
+            .select_from(rollup.__table__.join(fresh, stored_key == fresh.c[key], full=True))
+            .where(or_(*mismatches))
+        ).all()
+        if rows:
+            drift[rollup.__tablename__] = [dict(row._mapping) for row in rows]
+    return drift
+
+
+if __name__ == '__main__':
+    from models.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the source, branch and company rollup tables.")
+    parser.add_argument('command', choices=["rebuild", "verify"], help='Recompute the rollups, or report rows that drifted')
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "rebuild":
+            rebuild(db)
+            print("Rollups have been rebuilt")
+        else:
+            drift = verify(db)
+            for table, rows in drift.items():
+                print(f"{table}: {len(rows)} drifted rows")
+                for row in rows:
+                    print(f"  {row}")
+            if drift:
+                sys.exit(1)
+            print("Rollups match the fact tables")
+    finally:
+        db.close()
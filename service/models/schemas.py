@@ -1,9 +1,13 @@
-from datetime import date
+from datetime import date, datetime, timezone
 from sqlite3 import Date
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 # Company
 class CompanyBase(BaseModel):
     c_name: str
@@ -120,6 +124,7 @@ class CarbonFootprintBase(BaseModel):
 
 class CarbonFootprintCreate(CarbonFootprintBase):
     source_id: int
+    measured_at: datetime = Field(default_factory=utc_now)
 
 class CarbonFootprintUpdate(BaseModel):
     footprint_value: float
@@ -128,6 +133,7 @@ class CarbonFootprintUpdate(BaseModel):
 class CarbonFootprint(CarbonFootprintBase):
     id: int
     source_id: int
+    measured_at: datetime
 
     class Config:
         orm_mode = True
@@ -140,6 +146,7 @@ class CarbonSequestrationBase(BaseModel):
 
 class CarbonSequestrationCreate(CarbonSequestrationBase):
     source_id: int
+    measured_at: datetime = Field(default_factory=utc_now)
 
 class CarbonSequestrationUpdate(BaseModel):
     seq_val: float
@@ -148,6 +155,72 @@ class CarbonSequestrationUpdate(BaseModel):
 class CarbonSequestration(CarbonSequestrationBase):
     id: int
     source_id: int
+    measured_at: datetime
 
     class Config:
         orm_mode = True
+
+
+# Period aggregation
+class Period(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+    quarter = "quarter"
+    year = "year"
+
+
+class PeriodTotals(BaseModel):
+    period_start: datetime
+    total_emissions: float
+    total_sequestrations: float
+
+
+# Export
+class ExportFormat(str, Enum):
+    arrow = "arrow"
+    parquet = "parquet"
+
+
+# Batch changes
+class BatchTableName(str, Enum):
+    companies = "companies"
+    branches = "branches"
+    carbon_offsets = "carbon_offsets"
+    emissionssources = "emissionssources"
+    regulations = "regulations"
+    footprints = "footprints"
+    sequestrations = "sequestrations"
+
+
+class BatchChanges(BaseModel):
+    # Fields merged into every added row, e.g. the parent's ID
+    defaults: Dict[str, Any] = {}
+    added: List[Dict[str, Any]] = []
+    # Changed fields by row ID
+    edited: Dict[int, Dict[str, Any]] = {}
+    deleted: List[int] = []
+
+
+class BatchRowResult(BaseModel):
+    action: str
+    row: int
+    id: Optional[int]
+    detail: Optional[str]
+
+
+class BatchResult(BaseModel):
+    applied: bool
+    results: List[BatchRowResult]
+
+
+# Bulk ingestion
+class BulkRowError(BaseModel):
+    row: int
+    detail: str
+
+
+class BulkInsertResult(BaseModel):
+    inserted: int
+    ids: List[Optional[int]]
+    errors: List[BulkRowError]
@@ -0,0 +1,123 @@
+from sqlalchemy import DDL, Sequence, String, bindparam, column, event, func as F, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from models import models
+from models.database import Base
+
+# Tables whose changes are versioned -> column scoping their versions. Tables scoped by a parent
+# column get one version per parent (e.g. "company_branches:12"), the others one per table.
+VERSIONED_TABLES = {
+    "companies": None,
+    "carbon_regulations": None,
+    "carbon_offsets": "company_id",
+    "company_branches": "company_id",
+    "carbon_emissions_sources": "branch_id",
+    "carbon_footprints": "source_id",
+    "carbon_sequestration": "source_id",
+}
+
+# Statement-level triggers bump the versions of every scope a statement touched, so writes from
+# anywhere (crud, bulk paths, populate scripts, psql) move the ETags of the affected resources.
+# Versions come from a sequence, so they never repeat even when a transaction rolls back.
+BUMP_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION bump_change_versions() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    parent_column text := TG_ARGV[0];
+    changed text;
+BEGIN
+    IF parent_column IS NULL THEN
+        INSERT INTO change_versions (scope, version) VALUES (TG_TABLE_NAME, nextval('change_version_seq'))
+        ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        changed := format('SELECT %I AS parent FROM new_rows', parent_column);
+    ELSIF TG_OP = 'DELETE' THEN
+        changed := format('SELECT %I AS parent FROM old_rows', parent_column);
+    ELSE
+        changed := format('SELECT %I AS parent FROM old_rows UNION ALL SELECT %I FROM new_rows', parent_column, parent_column);
+    END IF;
+    -- Sorted so concurrent statements lock version rows in the same order
+    EXECUTE format(
+        'INSERT INTO change_versions (scope, version) '
+        'SELECT scope, nextval(''change_version_seq'') FROM ('
+        '    SELECT DISTINCT %L || '':'' || parent AS scope FROM (%s) changed WHERE parent IS NOT NULL'
+        ') scopes ORDER BY scope '
+        'ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version',
+        TG_TABLE_NAME, changed
+    );
+    RETURN NULL;
+END
+$$
+"""
+
+
+def trigger_statements(table: str, parent_column: str = None) -> list:
+    """
+    Get the statements creating the version-bumping triggers of a table.
+
+    Postgres only allows transition tables on single-event triggers, hence one trigger per event.
+    """
+    argument = f"'{parent_column}'" if parent_column else ""
+    return [
+        f"CREATE TRIGGER {table}_bump_versions_insert AFTER INSERT ON {table} "
+        f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_change_versions({argument})",
+        f"CREATE TRIGGER {table}_bump_versions_update AFTER UPDATE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_change_versions({argument})",
+        f"CREATE TRIGGER {table}_bump_versions_delete AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION bump_change_versions({argument})",
+    ]
+
+
+# Install the triggers when a table is created with metadata.create_all rather than Alembic
+for _table, _parent_column in VERSIONED_TABLES.items():
+    # DDL applies %-formatting, so the format() placeholders need escaping
+    event.listen(Base.metadata.tables[_table], "after_create", DDL(BUMP_FUNCTION_SQL.replace("%", "%%")))
+    for _statement in trigger_statements(_table, _parent_column):
+        event.listen(Base.metadata.tables[_table], "after_create", DDL(_statement))
+
+
+def scope(table: str, parent_id: int = None) -> str:
+    """
+    Get the name of the scope versioning a table, or a parent's rows in it.
+    """
+    return table if parent_id is None else f"{table}:{parent_id}"
+
+
+def current_version(db: Session, scope: str) -> int:
+    """
+    Get the current version of a scope.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        scope (str): Scope from scope().
+
+    Returns:
+        int: The version, or 0 if nothing in the scope has changed since versioning began.
+    """
+    version = db.query(models.ChangeVersion.version).filter(models.ChangeVersion.scope == scope).scalar()
+    return version or 0
+
+
+def bump_versions(db: Session, scopes: list):
+    """
+    Give scopes new versions, for changes the triggers do not see, e.g. detaching a partition.
+
+    Args:
+        db (Session): SQLAlchemy database session.
+        scopes (list): Scopes from scope().
+    """
+    if not scopes:
+        return
+    # An array rather than a VALUES row per scope, so the statement compiles once however many scopes change
+    changed = F.unnest(bindparam("scopes", sorted(set(scopes)), type_=ARRAY(String))).table_valued(
+        column("scope", String),
+    ).render_derived(name="changed")
+    # Sorted like the triggers' bumps, so concurrent statements lock version rows in the same order
+    stmt = pg_insert(models.ChangeVersion).from_select(
+        ["scope", "version"],
+        select(changed.c.scope, Sequence("change_version_seq").next_value()).order_by(changed.c.scope),
+    )
+    db.execute(stmt.on_conflict_do_update(index_elements=["scope"], set_={"version": stmt.excluded.version}))
@@ -0,0 +1,21 @@
+import hmac
+import os
+
+from fastapi import HTTPException, Request
+
+# Bearer token the operational endpoints (metrics, pool, slow queries, cache stats) require; unset disables them
+OPS_TOKEN = os.getenv("OPS_TOKEN", "")
+
+
+def require_token(request: Request):
+    """
+    Dependency admitting only requests sent with `Authorization: Bearer <OPS_TOKEN>`.
+
+    Raises:
+        HTTPException: 404 while OPS_TOKEN is unset, 401 if the token is missing or wrong.
+    """
+    if not OPS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), OPS_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid operations token", headers={"WWW-Authenticate": "Bearer"})
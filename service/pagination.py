@@ -0,0 +1,61 @@
+import base64
+import binascii
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encode the position after a row as an opaque cursor.
+
+    Args:
+        last_id (int): ID of the last row of the current page.
+
+    Returns:
+        str: URL-safe cursor to pass back as the `cursor` query parameter.
+    """
+    payload = json.dumps({"after_id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Cursor from the `cursor` query parameter, or None for the first page.
+
+    Returns:
+        int: ID to continue after, or None for the first page.
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    if cursor is None:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after_id = json.loads(payload)["after_id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(after_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return after_id
+
+
+def set_next_cursor(response: Response, rows: list, limit: int):
+    """
+    Advertise the cursor of the next page on a list response.
+
+    The header is only set when the page is full, so its absence marks the last page.
+
+    Args:
+        response (Response): Response of the list route.
+        rows (list): Rows of the current page, ordered by ID.
+        limit (int): Page size that was requested.
+    """
+    if rows and len(rows) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
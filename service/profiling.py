@@ -0,0 +1,177 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from functools import wraps
+
+from fastapi import Request
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+
+from models.database import _env_bool
+
+# Debug only: profiling runs the request under a sampler and replaces its response
+PROFILING_ENABLED = _env_bool("PROFILING_ENABLED", False)
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+
+# Values of the profile query parameter or X-Profile header, by output format
+PROFILE_FORMATS = {"1": "speedscope", "true": "speedscope", "speedscope": "speedscope", "collapsed": "collapsed"}
+
+
+class Sampler:
+    """
+    Samples the Python stacks of the threads working on one request at a fixed interval.
+
+    The event loop thread is sampled from the start; threadpool workers are sampled while
+    they run a function wrapped with traced(). The loop is shared, so other requests served
+    at the same time show up in its stacks.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.threads = {threading.get_ident()}
+        # (thread ident, stack from root to leaf, seconds the sample stands for)
+        self.samples = []
+        self.duration = 0.0
+        self._started = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.samples.append((ident, _stack(frame), now - last))
+            last = now
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+
+# The sampler of the request being profiled, if any
+current_profile = ContextVar("current_profile", default=None)
+
+
+def _stack(frame) -> tuple:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def traced(function):
+    """
+    Wrap a function run in the threadpool so the profiler samples its thread while it runs.
+
+    Outside a profiled request the function is called as is.
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        sampler = current_profile.get()
+        if sampler is None:
+            return function(*args, **kwargs)
+        ident = threading.get_ident()
+        sampler.threads.add(ident)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            sampler.threads.discard(ident)
+    return wrapper
+
+
+def _thread_names() -> dict:
+    return {thread.ident: thread.name for thread in threading.enumerate()}
+
+
+def speedscope(sampler: Sampler, name: str) -> dict:
+    """
+    Convert a sampler's samples to speedscope's file format, one profile per thread.
+    """
+    frames, frame_index = [], {}
+    profiles = {}
+    for ident, stack, weight in sampler.samples:
+        indices = []
+        for frame in stack:
+            if frame not in frame_index:
+                frame_index[frame] = len(frames)
+                frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+            indices.append(frame_index[frame])
+        profile = profiles.setdefault(ident, {"samples": [], "weights": []})
+        profile["samples"].append(indices)
+        profile["weights"].append(weight)
+    names = _thread_names()
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "service profiling",
+        "shared": {"frames": frames},
+        "profiles": [
+            {
+                "type": "sampled",
+                "name": names.get(ident, str(ident)),
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(profile["weights"]),
+                "samples": profile["samples"],
+                "weights": profile["weights"],
+            }
+            for ident, profile in profiles.items()
+        ],
+    }
+
+
+def collapsed(sampler: Sampler) -> str:
+    """
+    Convert a sampler's samples to collapsed stacks (thread;frame;...;frame count), as read by flamegraph.pl.
+    """
+    names = _thread_names()
+    counts = Counter()
+    for ident, stack, _ in sampler.samples:
+        frames = [names.get(ident, str(ident))]
+        frames += [f"{name} ({os.path.basename(filename)}:{line})" for name, filename, line in stack]
+        counts[";".join(frames)] += 1
+    return "".join(f"{stack} {count}\n" for stack, count in counts.items())
+
+
+async def profile_request(request: Request, call_next):
+    """
+    HTTP middleware profiling requests sent with ?profile=1 or an X-Profile header.
+
+    The response, including its body, is produced as usual under the sampler and then
+    replaced by the profile: speedscope JSON by default, or collapsed stacks for
+    profile=collapsed.
+    """
+    mode = request.query_params.get("profile") or request.headers.get("x-profile")
+    profile_format = PROFILE_FORMATS.get((mode or "").lower())
+    if profile_format is None:
+        return await call_next(request)
+
+    sampler = Sampler(PROFILE_INTERVAL_MS / 1000)
+    token = current_profile.set(sampler)
+    sampler.start()
+    try:
+        response = await call_next(request)
+        async for _ in response.body_iterator:
+            pass
+    finally:
+        sampler.stop()
+        current_profile.reset(token)
+
+    headers = {"X-Profile-Duration": f"{sampler.duration:.6f}", "X-Profile-Status": str(response.status_code)}
+    if profile_format == "collapsed":
+        return PlainTextResponse(collapsed(sampler), headers=headers)
+    name = f"{request.method} {request.url.path} ({response.status_code})"
+    return ORJSONResponse(speedscope(sampler, name), headers=headers)
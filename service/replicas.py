@@ -0,0 +1,64 @@
+import itertools
+import math
+import os
+import time
+
+from fastapi import Request
+
+# Seconds after a write during which the writing client's reads go to the primary, so it sees
+# its own changes despite replication lag; 0 turns the window off
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+LAST_WRITE_COOKIE = "last_write"
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+_next_replica = itertools.count()
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Check whether the client made a write within the read-your-writes window.
+
+    Args:
+        request (Request): The incoming request.
+
+    Returns:
+        bool: Whether the request's last-write cookie is younger than READ_YOUR_WRITES_SECONDS.
+    """
+    if READ_YOUR_WRITES_SECONDS <= 0:
+        return False
+    try:
+        written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ""))
+    except ValueError:
+        return False
+    return time.time() - written_at < READ_YOUR_WRITES_SECONDS
+
+
+def read_sessionmaker(request: Request, primary, replicas: list):
+    """
+    Choose the sessionmaker a read-only request is served from.
+
+    Args:
+        request (Request): The incoming request.
+        primary: Sessionmaker of the primary database.
+        replicas (list): Sessionmakers of the read replicas, possibly empty.
+
+    Returns:
+        The next replica's sessionmaker in round robin, or the primary's when there are no
+        replicas or the client wrote recently.
+    """
+    if not replicas or wrote_recently(request):
+        return primary
+    return replicas[next(_next_replica) % len(replicas)]
+
+
+async def track_writes(request: Request, call_next):
+    """
+    HTTP middleware setting the last-write cookie on responses to successful writes.
+    """
+    response = await call_next(request)
+    if request.method in WRITE_METHODS and response.status_code < 400:
+        response.set_cookie(
+            LAST_WRITE_COOKIE, f"{time.time():.3f}", max_age=math.ceil(READ_YOUR_WRITES_SECONDS), httponly=True, samesite="lax",
+        )
+    return response
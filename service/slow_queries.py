@@ -0,0 +1,159 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import NullPool
+
+import metrics
+from models.database import _env_bool
+
+# Statements slower than this are logged
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Most recent slow statements kept; older ones are dropped
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "100"))
+# Debug only: capture an EXPLAIN (ANALYZE, BUFFERS) plan of slow SELECTs. ANALYZE runs the query again.
+SLOW_QUERY_EXPLAIN = _env_bool("SLOW_QUERY_EXPLAIN", False)
+SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", "30000"))
+
+# Bind parameters hold the data being read or written, so they are only logged on request
+SLOW_QUERY_LOG_PARAMETERS = _env_bool("SLOW_QUERY_LOG_PARAMETERS", False)
+# Longest repr of the bind parameters kept per entry
+MAX_PARAMETERS_LENGTH = 2000
+
+_READ_ONLY = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b|\bFOR\s+(UPDATE|SHARE|NO\s+KEY|KEY)\b", re.IGNORECASE)
+_NUMBERED_PARAMETER = re.compile(r"\$(\d+)")
+
+
+class SlowQueryLog:
+    """
+    Thread-safe ring buffer of the most recent slow statements.
+    """
+
+    def __init__(self, maxsize: int):
+        self._entries = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict):
+        with self._lock:
+            self._entries.append(entry)
+
+    def set_plan(self, entry: dict, plan: str = None, error: str = None):
+        with self._lock:
+            entry["plan"] = plan
+            entry["plan_error"] = error
+
+    def entries(self, limit: int = None) -> list:
+        """
+        Get copies of the logged entries, newest first.
+        """
+        with self._lock:
+            entries = [dict(entry) for entry in reversed(self._entries)]
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+slow_query_log = SlowQueryLog(SLOW_QUERY_LOG_SIZE)
+
+# Plans are captured one at a time on a connection of their own to the server the statement ran
+# on, outside any request's transaction; a slow query arriving while one is being explained is
+# logged without a plan
+_explain_engines = {}
+_explain_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+_explain_slot = threading.Semaphore(1)
+
+
+def _explainable(statement: str, context, executemany: bool) -> bool:
+    if executemany or context is None or context.isinsert or context.isupdate or context.isdelete:
+        return False
+    return bool(_READ_ONLY.match(statement)) and not _WRITES.search(statement)
+
+
+def _psycopg2_statement(statement: str, parameters):
+    """
+    Convert a statement in asyncpg's numbered $1 style to psycopg2's format style, for the explain connection.
+    """
+    if isinstance(parameters, (list, tuple)) and _NUMBERED_PARAMETER.search(statement):
+        order = [int(number) - 1 for number in _NUMBERED_PARAMETER.findall(statement)]
+        statement = _NUMBERED_PARAMETER.sub("%s", statement.replace("%", "%%"))
+        return statement, tuple(parameters[index] for index in order)
+    return statement, parameters
+
+
+def _explain(entry: dict, url, statement: str, parameters):
+    try:
+        # Async engines' statements are converted to psycopg2's style, see _psycopg2_statement
+        url = url.set(drivername="postgresql+psycopg2")
+        if url not in _explain_engines:
+            _explain_engines[url] = create_engine(url, poolclass=NullPool)
+        connection = _explain_engines[url].raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"SET LOCAL statement_timeout = {SLOW_QUERY_EXPLAIN_TIMEOUT_MS}")
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+            connection.rollback()
+        finally:
+            connection.close()
+        slow_query_log.set_plan(entry, plan=plan)
+    except Exception as e:
+        slow_query_log.set_plan(entry, error=f"{type(e).__name__}: {e}")
+    finally:
+        _explain_slot.release()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["slow_query_started"].pop()) * 1000
+    if elapsed_ms < SLOW_QUERY_MS:
+        return
+    stats = metrics.current_stats.get()
+    entry = {
+        "captured_at": datetime.now(timezone.utc).isoformat(),
+        "route": stats.route if stats is not None else None,
+        "method": stats.request.method if stats is not None else None,
+        "duration_ms": round(elapsed_ms, 3),
+        "statement": statement,
+        "parameters": repr(parameters)[:MAX_PARAMETERS_LENGTH] if SLOW_QUERY_LOG_PARAMETERS else None,
+        "plan": None,
+        "plan_error": None,
+    }
+    slow_query_log.add(entry)
+    if not SLOW_QUERY_EXPLAIN:
+        return
+    if not _explainable(statement, context, executemany):
+        slow_query_log.set_plan(entry, error="Not explained: only single SELECT statements are re-run with ANALYZE")
+    elif not _explain_slot.acquire(blocking=False):
+        slow_query_log.set_plan(entry, error="Not explained: another plan was being captured")
+    else:
+        _explain_executor.submit(_explain, entry, conn.engine.url, *_psycopg2_statement(statement, parameters))
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("slow_query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """
+    Log the statements of an engine that run longer than SLOW_QUERY_MS.
+
+    Args:
+        engine: Engine or AsyncEngine to instrument.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
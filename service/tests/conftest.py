@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pytest
+from sqlalchemy import exc
+
+# Run against the database at DATABASE_URL, migrated with `alembic -c models/alembic.ini upgrade head`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.database import SessionLocal, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    try:
+        with engine.connect():
+            pass
+    except exc.OperationalError:
+        pytest.skip("No database at DATABASE_URL")
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Entering the client runs the app's lifespan, which starts the summary cache listener
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def source(client):
+    """
+    A new company with one branch and one emission source; yields the (company, branch, source) IDs.
+    """
+    company_id = client.post("/companies/", json={"c_name": "Test Company"}).json()["id"]
+    branch_id = client.post("/branches/", json={"company_id": company_id, "branch_name": "Test Branch"}).json()["id"]
+    source_id = client.post(
+        "/emissionssource/", json={"branch_id": branch_id, "source_type": "Factory Emission", "total_emission_value": 1.0},
+    ).json()["id"]
+    yield company_id, branch_id, source_id
+    client.delete(f"/company/{company_id}")
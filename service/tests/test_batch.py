@@ -0,0 +1,70 @@
+from models import rollups
+
+
+def test_edit_changes_fields_and_rollups(client, db, source):
+    _, _, source_id = source
+    added = client.post("/footprints/batch", json={"defaults": {"source_id": source_id}, "added": [{"footprint_value": 10.0}]})
+    footprint_id = added.json()["results"][0]["id"]
+
+    response = client.post("/footprints/batch", json={"edited": {str(footprint_id): {"footprint_value": "12.5"}}})
+
+    assert response.status_code == 200
+    assert response.json() == {"applied": True, "results": [{"action": "edit", "row": 0, "id": footprint_id, "detail": None}]}
+    footprints = client.get(f"/emissionssource/{source_id}/footprints/").json()
+    assert [footprint["footprint_value"] for footprint in footprints] == [12.5]
+    assert rollups.verify(db) == {}
+
+
+def test_invalid_edit_is_rejected_per_row(client, source):
+    company_id, _, _ = source
+    response = client.post("/companies/batch", json={"edited": {str(company_id): {"c_name": None}}})
+
+    assert response.status_code == 400
+    result = response.json()
+    assert result["applied"] is False
+    assert [(row["action"], row["id"]) for row in result["results"]] == [("edit", company_id)]
+    assert client.get(f"/company/{company_id}").json()["c_name"] == "Test Company"
+
+
+def test_duplicate_deletes_are_rejected(client, db, source):
+    _, branch_id, source_id = source
+    added = client.post(
+        "/footprints/batch", json={"defaults": {"source_id": source_id}, "added": [{"footprint_value": 10.0}, {"footprint_value": 5.0}]},
+    )
+    footprint_id = added.json()["results"][0]["id"]
+
+    for table, row_id in [("footprints", footprint_id), ("emissionssources", source_id), ("branches", branch_id)]:
+        response = client.post(f"/{table}/batch", json={"deleted": [row_id, row_id]})
+
+        assert response.status_code == 400
+        assert [(row["action"], row["row"]) for row in response.json()["results"]] == [("delete", 1)]
+    assert len(client.get(f"/emissionssource/{source_id}/footprints/").json()) == 2
+    assert rollups.verify(db) == {}
+
+
+def test_deleting_several_branches_and_sources_updates_rollups(client, db, source):
+    company_id, branch_id, source_id = source
+    new_sources = client.post(
+        "/emissionssources/batch",
+        json={"defaults": {"branch_id": branch_id, "source_type": "Factory Emission", "total_emission_value": 1.0}, "added": [{}, {}]},
+    ).json()["results"]
+    new_branches = client.post(
+        "/branches/batch", json={"defaults": {"company_id": company_id}, "added": [{"branch_name": "A"}, {"branch_name": "B"}]},
+    ).json()["results"]
+    sources = [source_id] + [row["id"] for row in new_sources]
+    for row in new_branches:
+        sources.append(client.post(
+            "/emissionssource/", json={"branch_id": row["id"], "source_type": "Factory Emission", "total_emission_value": 1.0},
+        ).json()["id"])
+    for value, footprint_source in enumerate(sources, start=1):
+        client.post("/footprint/", json={"source_id": footprint_source, "footprint_value": float(value)})
+
+    response = client.post("/emissionssources/batch", json={"deleted": sources[1:3]})
+    assert response.status_code == 200
+    assert rollups.verify(db) == {}
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 1.0 + 4.0 + 5.0
+
+    response = client.post("/branches/batch", json={"deleted": [row["id"] for row in new_branches]})
+    assert response.status_code == 200
+    assert rollups.verify(db) == {}
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 1.0
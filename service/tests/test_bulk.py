@@ -0,0 +1,45 @@
+import json
+
+from models import rollups
+
+
+def test_bulk_insert_returns_ids_and_errors_per_row(client, db, source):
+    _, _, source_id = source
+    rows = [
+        {"source_id": source_id, "footprint_value": 1.0},
+        {"source_id": source_id},
+        {"source_id": 0, "footprint_value": 2.0},
+        {"source_id": source_id, "footprint_value": 3.0},
+    ]
+
+    response = client.post("/footprints/bulk", json=rows)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 2
+    assert result["ids"][1:3] == [None, None]
+    assert [error["row"] for error in result["errors"]] == [1, 2]
+    footprints = client.get(f"/emissionssource/{source_id}/footprints/").json()
+    assert [(footprint["id"], footprint["footprint_value"]) for footprint in footprints] == [
+        (result["ids"][0], 1.0), (result["ids"][3], 3.0),
+    ]
+    assert rollups.verify(db) == {}
+
+
+def test_bulk_insert_accepts_ndjson(client, db, source):
+    _, _, source_id = source
+    body = "\n".join(json.dumps({"source_id": source_id, "seq_value": value}) for value in [1.0, 2.0]) + "\n"
+
+    response = client.post("/sequestrations/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 2
+    assert len(client.get(f"/emissionssource/{source_id}/sequestrations/").json()) == 2
+    assert rollups.verify(db) == {}
+
+
+def test_bulk_insert_rejects_invalid_ndjson(client, source):
+    response = client.post("/footprints/bulk", content='{"source_id": 1}\n{', headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid JSON on line 2"
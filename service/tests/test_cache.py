@@ -0,0 +1,60 @@
+import time
+
+from sqlalchemy import text
+
+from models.cache import summary_cache
+from models.database import engine
+
+
+def _insert_offset(company_id: int, amount: float):
+    # A Core connection bypasses the session events, like a write committed by another worker
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO carbon_offsets (company_id, offset_type, offset_amount) VALUES (:company_id, 'reforestation', :amount)"),
+            {"company_id": company_id, "amount": amount},
+        )
+
+
+def _wait_for_listener():
+    deadline = time.monotonic() + 5
+    while not summary_cache.listening:
+        assert time.monotonic() < deadline, "summary cache listener did not connect"
+        time.sleep(0.05)
+
+
+def test_summary_cache_sees_writes_from_other_processes(client, source):
+    company_id, _, _ = source
+    _wait_for_listener()
+    assert client.get(f"/company/{company_id}/summary").json()["total_offsets"] == 0
+
+    _insert_offset(company_id, 40)
+
+    # The notification arrives shortly after the commit
+    deadline = time.monotonic() + 5
+    while client.get(f"/company/{company_id}/summary").json()["total_offsets"] != 40:
+        assert time.monotonic() < deadline, "cached summary was not invalidated"
+        time.sleep(0.05)
+
+
+def test_summary_cache_keeps_entries_across_unrelated_writes(client, source):
+    company_id, _, _ = source
+    _wait_for_listener()
+    client.get(f"/company/{company_id}/summary")
+    invalidations = summary_cache.invalidations
+
+    name = f"Test Regulation {time.monotonic_ns()}"
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO carbon_regulations (regulation_name, description) VALUES (:name, 'unrelated')"), {"name": name},
+        )
+    try:
+        # Long enough for a notification to arrive, had the write sent one
+        time.sleep(0.5)
+
+        hits = summary_cache.hits
+        client.get(f"/company/{company_id}/summary")
+        assert summary_cache.hits == hits + 1
+        assert summary_cache.invalidations == invalidations
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text("DELETE FROM carbon_regulations WHERE regulation_name = :name"), {"name": name})
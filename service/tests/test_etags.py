@@ -0,0 +1,28 @@
+def test_if_none_match_returns_304_until_a_write(client, source):
+    _, _, source_id = source
+    route = f"/emissionssource/{source_id}/footprints/"
+    etag = client.get(route).headers["etag"]
+
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+    client.post("/footprint/", json={"source_id": source_id, "footprint_value": 1.0})
+    response = client.get(route, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert len(response.json()) == 1
+
+
+def test_write_to_another_parent_keeps_the_etag(client, source):
+    company_id, branch_id, source_id = source
+    other_source_id = client.post(
+        "/emissionssource/", json={"branch_id": branch_id, "source_type": "Factory Emission", "total_emission_value": 1.0},
+    ).json()["id"]
+    route = f"/emissionssource/{source_id}/footprints/"
+    etag = client.get(route).headers["etag"]
+
+    client.post("/footprint/", json={"source_id": other_source_id, "footprint_value": 1.0})
+
+    assert client.get(route, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,42 @@
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from models import crud, models, schemas
+
+# (route, response schema, crud function, the route's parent argument); the route is formatted with the test data's IDs
+LIST_ROUTES = [
+    ("/companies/", schemas.Company, crud.get_companies, None),
+    ("/companies/{company_id}/carbon_offsets/", schemas.CarbonOffset, crud.get_carbon_offsets, "company_id"),
+    ("/companies/{company_id}/branches/", schemas.CompanyBranch, crud.get_company_branches, "company_id"),
+    ("/branch/{branch_id}/emissionssources/", schemas.CarbonEmissionsSource, crud.get_carbon_emissions_sources, "branch_id"),
+    ("/emissionssource/{source_id}/footprints/", schemas.CarbonFootprint, crud.get_carbon_footprints, "source_id"),
+    ("/emissionssource/{source_id}/sequestrations/", schemas.CarbonSequestration, crud.get_carbon_sequestrations, "source_id"),
+    ("/regulations/", schemas.CarbonRegulation, crud.get_carbon_regulations, None),
+]
+
+
+@pytest.fixture
+def rows(client, source):
+    company_id, branch_id, source_id = source
+    client.post("/carbon_offsets/", json={"company_id": company_id, "offset_type": "reforestation", "offset_amount": 2.5, "date": "2026-01-01"})
+    for measured_at in ["2026-01-01T12:00:00+00:00", "2026-02-01T12:00:00.250000+02:00"]:
+        client.post("/footprint/", json={"source_id": source_id, "footprint_value": 0.1, "measured_at": measured_at})
+        client.post("/sequestration/", json={"source_id": source_id, "seq_value": 1e16, "measured_at": measured_at})
+    regulation_id = client.post("/regulations/", json={"regulation_name": f"Test Regulation {source_id}", "description": "Test"}).json()["id"]
+    yield {"company_id": company_id, "branch_id": branch_id, "source_id": source_id}
+    client.delete(f"/regulation/{regulation_id}")
+
+
+@pytest.mark.parametrize("route, schema, crud_function, parent", LIST_ROUTES, ids=[route[0] for route in LIST_ROUTES])
+def test_plain_list_body_matches_response_schema(client, db, rows, route, schema, crud_function, parent):
+    arguments = {parent: rows[parent]} if parent else {}
+    # What the route returned before, ORM objects validated through the response schema
+    expected = jsonable_encoder([
+        schema.parse_obj({field: getattr(row, field) for field in schema.__fields__})
+        for row in crud_function(db, limit=1000, **arguments)
+    ])
+
+    response = client.get(route.format(**rows), params={"limit": 1000})
+
+    assert response.status_code == 200
+    assert response.json() == expected
@@ -0,0 +1,33 @@
+import pytest
+
+import ops
+import slow_queries
+from models.database import engine
+
+OPS_ROUTES = ["/metrics", "/db/pool", "/db/slow_queries", "/cache/stats"]
+
+
+@pytest.mark.parametrize("route", OPS_ROUTES)
+def test_ops_routes_are_disabled_without_a_token(client, monkeypatch, route):
+    monkeypatch.setattr(ops, "OPS_TOKEN", "")
+
+    assert client.get(route, headers={"Authorization": "Bearer "}).status_code == 404
+
+
+@pytest.mark.parametrize("route", OPS_ROUTES)
+def test_ops_routes_require_the_token(client, monkeypatch, route):
+    monkeypatch.setattr(ops, "OPS_TOKEN", "secret")
+
+    assert client.get(route).status_code == 401
+    assert client.get(route, headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get(route, headers={"Authorization": "Bearer secret"}).status_code == 200
+
+
+def test_slow_queries_leave_out_parameters_by_default(client, monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    statement = "SELECT CAST(%(secret)s AS text) AS slow_query_parameters"
+    with engine.connect() as connection:
+        connection.exec_driver_sql(statement, {"secret": "hunter2"})
+
+    entry = next(entry for entry in slow_queries.slow_query_log.entries() if entry["statement"] == statement)
+    assert entry["parameters"] is None
@@ -0,0 +1,30 @@
+from pagination import NEXT_CURSOR_HEADER
+
+
+def test_cursor_pages_return_every_row_once_across_inserts(client, source):
+    _, _, source_id = source
+    for value in range(7):
+        client.post("/footprint/", json={"source_id": source_id, "footprint_value": float(value)})
+    route = f"/emissionssource/{source_id}/footprints/"
+    expected = [footprint["id"] for footprint in client.get(route).json()]
+
+    seen, params = [], {"limit": 3}
+    while True:
+        response = client.get(route, params=params)
+        assert response.status_code == 200
+        seen += [footprint["id"] for footprint in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+        # Rows inserted between pages land after the cursor, so no row is skipped or repeated
+        expected.append(client.post("/footprint/", json={"source_id": source_id, "footprint_value": 1.0}).json()["id"])
+        params = {"limit": 3, "cursor": cursor}
+
+    assert seen == expected
+
+
+def test_malformed_cursor_is_rejected(client, source):
+    _, _, source_id = source
+    response = client.get(f"/emissionssource/{source_id}/footprints/", params={"cursor": "not a cursor"})
+
+    assert response.status_code == 400
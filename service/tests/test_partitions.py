@@ -0,0 +1,28 @@
+import datetime
+
+from sqlalchemy import text
+
+from models import partitions, rollups
+
+QUARTER = datetime.date(2099, 1, 1)
+
+
+def test_detach_partition_takes_its_rows_out_of_rollups_and_etags(client, db, source):
+    company_id, _, source_id = source
+    partitions.create_partition(db, "carbon_footprints", QUARTER)
+    client.post("/footprint/", json={"source_id": source_id, "footprint_value": 3.0, "measured_at": "2026-01-01T00:00:00Z"})
+    for _ in range(2):
+        client.post("/footprint/", json={"source_id": source_id, "footprint_value": 10.0, "measured_at": "2099-02-01T00:00:00Z"})
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 23.0
+    etag = client.get(f"/emissionssource/{source_id}/footprints/").headers["etag"]
+
+    name = partitions.detach_partition(db, "carbon_footprints", QUARTER)
+    try:
+        assert rollups.verify(db) == {}
+        assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 3.0
+        response = client.get(f"/emissionssource/{source_id}/footprints/", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert [footprint["footprint_value"] for footprint in response.json()] == [3.0]
+    finally:
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
@@ -0,0 +1,25 @@
+from models import rollups
+
+
+def test_rollups_follow_creates_updates_and_deletes(client, db, source):
+    company_id, branch_id, source_id = source
+    footprint_id = client.post("/footprint/", json={"source_id": source_id, "footprint_value": 10.0}).json()["id"]
+    sequestration_id = client.post("/sequestration/", json={"source_id": source_id, "seq_value": 4.0}).json()["id"]
+    client.post("/footprint/", json={"source_id": source_id, "footprint_value": 5.0})
+    assert rollups.verify(db) == {}
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 15.0
+
+    client.put(f"/carbon_footprint/{footprint_id}", json={"footprint_value": 2.5})
+    client.put(f"/carbon_sequestration/{sequestration_id}", json={"seq_val": 1.5})
+    assert rollups.verify(db) == {}
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 7.5
+
+    client.delete(f"/carbon_footprint/{footprint_id}")
+    client.delete(f"/carbon_sequestration/{sequestration_id}")
+    assert rollups.verify(db) == {}
+    assert client.get(f"/company/{company_id}/summary").json()["total_emissions"] == 5.0
+
+    client.delete(f"/emissionssource/{source_id}")
+    assert rollups.verify(db) == {}
+    client.delete(f"/branch/{branch_id}")
+    assert rollups.verify(db) == {}
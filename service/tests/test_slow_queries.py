@@ -0,0 +1,30 @@
+import time
+
+from sqlalchemy import create_engine, text
+
+import slow_queries
+from models.database import engine
+
+
+def test_plans_are_captured_on_the_server_the_statement_ran_on(client, monkeypatch):
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(slow_queries, "SLOW_QUERY_EXPLAIN", True)
+    # Stands in for a replica: the statement divides by zero on any other connection
+    replica = create_engine(engine.url.update_query_dict({"application_name": "replica"}))
+    slow_queries.instrument_engine(replica)
+    statement = "SELECT 1 / (current_setting('application_name') = 'replica')::int"
+    try:
+        with replica.connect() as connection:
+            connection.execute(text(statement))
+
+        deadline = time.monotonic() + 5
+        while True:
+            entry = next(entry for entry in slow_queries.slow_query_log.entries() if entry["statement"] == statement)
+            if entry["plan"] is not None or entry["plan_error"] is not None:
+                break
+            assert time.monotonic() < deadline, "plan was not captured"
+            time.sleep(0.05)
+        assert entry["plan_error"] is None
+        assert "Result" in entry["plan"]
+    finally:
+        replica.dispose()
@@ -0,0 +1,51 @@
+from sqlalchemy import insert
+
+from models import models, rollups
+
+# Far past one list page, so a summary computed from a page of rows would come out short
+NUM_BRANCHES = 10000
+NUM_SOURCES = 10000
+
+
+def test_summaries_are_exact_past_one_list_page(client, db):
+    """
+    A company with NUM_BRANCHES single-source branches plus one branch holding NUM_SOURCES sources.
+
+    Every source gets one footprint of 1.0 and one sequestration of 0.5, so the expected totals
+    follow directly from the row counts.
+    """
+    company_id = client.post("/companies/", json={"c_name": "Large Summary Company"}).json()["id"]
+    try:
+        branch_ids = db.execute(
+            insert(models.CompanyBranch)
+            .values([{"company_id": company_id, "branch_name": f"Branch{i}"} for i in range(NUM_BRANCHES + 1)])
+            .returning(models.CompanyBranch.id)
+        ).scalars().all()
+        wide_branch_id = branch_ids.pop()
+        source_ids = db.execute(
+            insert(models.CarbonEmissionsSource)
+            .values([
+                {"branch_id": branch_id, "source_type": "Regression", "total_emission_value": 0.0}
+                for branch_id in branch_ids + [wide_branch_id] * NUM_SOURCES
+            ])
+            .returning(models.CarbonEmissionsSource.id)
+        ).scalars().all()
+        db.execute(insert(models.CarbonFootprint), [{"source_id": source_id, "footprint_value": 1.0} for source_id in source_ids])
+        db.execute(insert(models.CarbonSequestration), [{"source_id": source_id, "seq_value": 0.5} for source_id in source_ids])
+        rollups.apply_deltas(db, {
+            source_id: {"footprint_total": 1.0, "footprint_count": 1, "seq_total": 0.5, "seq_count": 1} for source_id in source_ids
+        })
+        db.commit()
+
+        company_summary = client.get(f"/company/{company_id}/summary").json()
+        assert company_summary["number_of_branches"] == NUM_BRANCHES + 1
+        assert company_summary["total_emissions"] == len(source_ids)
+        assert company_summary["total_sequestrations"] == len(source_ids) * 0.5
+
+        branch_summary = client.get(f"/baranch/{wide_branch_id}/summary").json()
+        assert branch_summary["number_of_sources"] == NUM_SOURCES
+        assert branch_summary["total_emissions"] == NUM_SOURCES
+        assert branch_summary["total_sequestrations"] == NUM_SOURCES * 0.5
+    finally:
+        db.rollback()
+        client.delete(f"/company/{company_id}")
@@ -0,0 +1,28 @@
+import pytest
+
+
+@pytest.mark.parametrize("route, body", [
+    ("/branches/", {"company_id": 0, "branch_name": "Test Branch"}),
+    ("/carbon_offsets/", {"company_id": 0, "offset_type": "reforestation", "offset_amount": 1.0, "date": "2026-01-01"}),
+    ("/emissionssource/", {"branch_id": 0, "source_type": "Factory Emission", "total_emission_value": 1.0}),
+    ("/footprint/", {"source_id": 0, "footprint_value": 1.0}),
+    ("/sequestration/", {"source_id": 0, "seq_value": 1.0}),
+])
+def test_create_with_missing_parent_returns_400(client, route, body):
+    response = client.post(route, json=body)
+
+    assert response.status_code == 400
+
+
+def test_update_and_delete_return_the_written_row(client, source):
+    _, _, source_id = source
+    footprint = client.post("/footprint/", json={"source_id": source_id, "footprint_value": 1.0}).json()
+
+    updated = client.put(f"/carbon_footprint/{footprint['id']}", json={"footprint_value": 2.0})
+    assert updated.status_code == 200
+    assert updated.json() == {**footprint, "footprint_value": 2.0}
+
+    deleted = client.delete(f"/carbon_footprint/{footprint['id']}")
+    assert deleted.status_code == 200
+    assert deleted.json()["id"] == footprint["id"]
+    assert client.delete(f"/carbon_footprint/{footprint['id']}").status_code == 404